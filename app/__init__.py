@@ -12,6 +12,26 @@ def create_app(config_class=Config):
     cors.init_app(app)
     socketio.init_app(app)
 
+    from app.services.cache_service import feed_cache
+    feed_cache.init_app(app)
+
+    from app.services.counter_service import like_counter
+    like_counter.init_app(app)
+
+    from app.services.notification_service import like_notifications
+    like_notifications.init_app(app)
+
+    from app.services.impression_service import impression_tracker
+    impression_tracker.init_app(app)
+
+    from app.services.story_service import story_sweeper, story_view_buffer
+    story_sweeper.init_app(app)
+    story_view_buffer.init_app(app)
+
+    # Register CLI maintenance commands
+    from app.commands import register_commands
+    register_commands(app)
+
     # Register socket events
     import app.chat_sockets as chat_sockets
 
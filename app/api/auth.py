@@ -276,6 +276,13 @@ def update_profile():
             post.user_image = user.user_image
 
         db.session.commit()
+
+        # Cached feed pages, single posts and story tray groups embed the old profile
+        from app.services.cache_service import feed_cache
+        from app.services.story_service import invalidate_story_groups
+        feed_cache.bump('feed', *(f'post:{post.id}' for post in posts_to_update))
+        invalidate_story_groups([old_username, user.username])
+
         return jsonify({
             'message': 'Profile updated successfully',
             'user': user.to_dict()
@@ -3,12 +3,45 @@ from app.extensions import db
 from app.models.chat import Conversation, Message
 from app.models.user import User
 from app.models.friend import Friend
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import aliased
+from app.utils import conditional_get
 import os
 
 bp = Blueprint('chat', __name__)
 
+def _profile_columns(user):
+    # Every column User.to_dict() embeds for a conversation participant
+    return (
+        user.username, user.email, user.full_name, user.user_image, user.mobile,
+        user.gender, user.bio, user.dob, user.last_seen, user.fcm_token
+    )
+
+def _conversations_version_stamp(**kwargs):
+    """One query over exactly the fields that change the conversations payload."""
+    user_id = request.args.get('user_id', type=int)
+    if not user_id:
+        return None
+
+    latest_message_id = db.session.query(func.max(Message.id)).filter(
+        Message.conversation_id == Conversation.id
+    ).correlate(Conversation).scalar_subquery()
+    user1 = aliased(User)
+    user2 = aliased(User)
+
+    rows = db.session.query(
+        Conversation.id, Conversation.updated_at,
+        Message.id, Message.status, Message.is_deleted,
+        *_profile_columns(user1), *_profile_columns(user2)
+    ).outerjoin(Message, Message.id == latest_message_id)\
+        .outerjoin(user1, user1.id == Conversation.user1_id)\
+        .outerjoin(user2, user2.id == Conversation.user2_id)\
+        .filter(or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id))\
+        .order_by(Conversation.id).all()
+    return [tuple(row) for row in rows]
+
 @bp.route('/conversations', methods=['GET'])
+@conditional_get(_conversations_version_stamp)
 def get_conversations():
     user_id = request.args.get('user_id')
     if not user_id:
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.friend import Friend
 from app.models.user import User
+from app.services.timeline_service import backfill_friendship
 
 bp = Blueprint('friends', __name__)
 
@@ -92,6 +93,7 @@ def accept_request():
         # Create reciprocal relationship for easier querying
         reciprocal = Friend(user_id=friend_request.friend_id, friend_id=friend_request.user_id, status='accepted')
         db.session.add(reciprocal)
+        backfill_friendship(friend_request.user, friend_request.friend)
         
         db.session.commit()
         
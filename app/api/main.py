@@ -9,3 +9,28 @@ def health_check():
 @bp.route('/')
 def index():
     return jsonify({'message': 'Welcome to FunAI Connect API'})
+
+@bp.route('/cache/stats')
+def cache_stats():
+    from app.services.cache_service import feed_cache
+    return jsonify(feed_cache.stats())
+
+@bp.route('/counters/stats')
+def counter_stats():
+    from app.services.counter_service import like_counter
+    return jsonify(like_counter.stats())
+
+@bp.route('/notifications/stats')
+def notification_stats():
+    from app.services.notification_service import like_notifications
+    return jsonify(like_notifications.stats())
+
+@bp.route('/impressions/stats')
+def impression_stats():
+    from app.services.impression_service import impression_tracker
+    return jsonify(impression_tracker.stats())
+
+@bp.route('/story-views/stats')
+def story_view_stats():
+    from app.services.story_service import story_view_buffer
+    return jsonify(story_view_buffer.stats())
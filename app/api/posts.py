@@ -4,14 +4,51 @@ from app.models.post import Post
 from app.models.like import Like
 from app.utils import save_image
 from app.utils import save_image
+from app.utils import paginate_by_cursor, conditional_get, parse_id
 import os
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from app.models.user import User
 from app.services.notification_service import send_comment_notification
-from app.services.notification_service import send_like_notification
+from app.services.notification_service import like_notifications
+from app.services.post_service import serialize_posts, serialize_post, fetch_posts_in_order
+from app.services.post_service import get_liked_post_ids, record_like_state
+from app.services.ranking_service import get_ranked_post_ids
+from app.services.counter_service import adjust_comments_count, adjust_replies_count, like_counter
+from app.services.comment_service import (
+    assign_path, comment_depth, get_inline_replies, get_subtree, delete_subtree,
+    MAX_REPLY_DEPTH, MAX_COMMENT_PREVIEW
+)
+from app.services.timeline_service import fan_out_post, get_timeline
+from app.services.cache_service import feed_cache, invalidate_post
+from app.services.hashtag_service import tag_post, get_posts_for_tag, normalize_tag
+from app.services.search_service import search_post_ids
+from app.services.like_service import get_likers, apply_like, like_request_user_id
+from app.services.impression_service import impression_tracker
 
 bp = Blueprint('posts', __name__)
 
+def _posts_version_stamp(**kwargs):
+    # Both maxima come straight off indexes, unlike a full-table COUNT. Creates raise
+    # max(id), comments and like counter flushes touch updated_at, and every post
+    # write including deletes bumps the feed cache version. Buffered like deltas and
+    # the viewer's own likes (hasLiked) are not in any post row, so they count too.
+    stamp = tuple(db.session.query(func.max(Post.id), func.max(Post.updated_at)).one())
+    stamp += (feed_cache.version('feed'), like_counter.changes)
+    viewer_id = parse_id(request.args.get('user_id'))
+    if viewer_id:
+        stamp += tuple(db.session.query(func.count(Like.id), func.max(Like.id)).filter(
+            Like.user_id == viewer_id
+        ).one())
+    return stamp
+
+def _comment_preview_size():
+    # Opt-in ?with_comments=N inlines the latest N comments per post in feed pages
+    return min(max(request.args.get('with_comments', 0, type=int), 0), MAX_COMMENT_PREVIEW)
+
 @bp.route('/', methods=['GET'])
+@conditional_get(_posts_version_stamp)
+@feed_cache.cached('feed')
 def get_posts():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
@@ -26,10 +63,42 @@ def get_posts():
         if current_user:
             posts_query = posts_query.filter(Post.user_handle != current_user.username)
             
+    # Engagement-ranked mode scores a recent candidate window instead of pure recency
+    if request.args.get('sort') == 'ranked':
+        viewer_id = int(user_id) if user_id and str(user_id).isdigit() else None
+        ranked_ids = get_ranked_post_ids(posts_query, user_id=viewer_id, cache_key=f"feed:{user_id or ''}")
+        start = (page - 1) * per_page
+        total = len(ranked_ids)
+
+        return jsonify({
+            'posts': serialize_posts(
+                fetch_posts_in_order(ranked_ids[start:start + per_page]),
+                current_user_id=user_id, with_comments=_comment_preview_size()
+            ),
+            'has_next': start + per_page < total,
+            'has_prev': page > 1,
+            'total': total,
+            'pages': -(-total // per_page) if per_page > 0 else 0
+        }), 200
+
+    # Opt-in keyset mode: ?cursor= (empty for the first page) skips COUNT(*) and OFFSET
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = paginate_by_cursor(posts_query, Post.created_at, Post.id, cursor, per_page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'posts': serialize_posts(items, current_user_id=user_id, with_comments=_comment_preview_size()),
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        }), 200
+
     posts_query = posts_query.order_by(Post.created_at.desc())
     posts_pagination = posts_query.paginate(page=page, per_page=per_page, error_out=False)
     
-    posts = [post.to_dict(current_user_id=user_id) for post in posts_pagination.items]
+    posts = serialize_posts(posts_pagination.items, current_user_id=user_id, with_comments=_comment_preview_size())
     
     return jsonify({
         'posts': posts,
@@ -39,13 +108,125 @@ def get_posts():
         'pages': posts_pagination.pages
     }), 200
 
+@bp.route('/timeline', methods=['GET'])
+def get_home_timeline():
+    user_id = request.args.get('user_id', type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+
+    try:
+        posts, next_cursor = get_timeline(user_id, cursor=cursor, per_page=per_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'posts': serialize_posts(posts, current_user_id=user_id, with_comments=_comment_preview_size()),
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }), 200
+
+@bp.route('/hashtag/<tag>', methods=['GET'])
+def get_hashtag_posts(tag):
+    user_id = request.args.get('user_id')
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+
+    try:
+        posts, next_cursor = get_posts_for_tag(tag, cursor=cursor, per_page=per_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'tag': normalize_tag(tag),
+        'posts': serialize_posts(posts, current_user_id=user_id, with_comments=_comment_preview_size()),
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }), 200
+
+@bp.route('/search', methods=['GET'])
+def search_posts():
+    q = (request.args.get('q') or '').strip()
+    user_id = request.args.get('user_id')
+    per_page = request.args.get('per_page', 10, type=int)
+    cursor = request.args.get('cursor')
+
+    if not q:
+        return jsonify({'error': 'q is required'}), 400
+
+    try:
+        post_ids, next_cursor = search_post_ids(q, cursor=cursor, per_page=per_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'query': q,
+        'posts': serialize_posts(
+            fetch_posts_in_order(post_ids), current_user_id=user_id, with_comments=_comment_preview_size()
+        ),
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }), 200
+
+@bp.route('/batch', methods=['GET'])
+def get_posts_batch():
+    user_id = request.args.get('user_id')
+    raw_ids = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+
+    if not raw_ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if not all(value.isdigit() for value in raw_ids):
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+
+    # De-duplicate while keeping the requested order
+    post_ids = list(dict.fromkeys(int(value) for value in raw_ids))
+    max_ids = current_app.config['POSTS_BATCH_MAX_IDS']
+    if len(post_ids) > max_ids:
+        return jsonify({'error': f'At most {max_ids} ids can be requested at once'}), 400
+
+    posts = fetch_posts_in_order(post_ids)
+    found_ids = {post.id for post in posts}
+
+    return jsonify({
+        'posts': serialize_posts(posts, current_user_id=user_id, with_comments=_comment_preview_size()),
+        'missing': [post_id for post_id in post_ids if post_id not in found_ids]
+    }), 200
+
+@bp.route('/impressions', methods=['POST'])
+def record_impressions():
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No input data provided'}), 400
+
+    post_ids = data.get('postIds')
+    if not isinstance(post_ids, list) or not all(isinstance(post_id, int) for post_id in post_ids):
+        return jsonify({'error': 'postIds must be a list of integers'}), 400
+
+    max_ids = current_app.config['IMPRESSIONS_MAX_IDS']
+    if len(post_ids) > max_ids:
+        return jsonify({'error': f'At most {max_ids} postIds can be recorded at once'}), 400
+
+    # Signed-in viewers are counted by id, anonymous ones by client address
+    user_id = parse_id(data.get('userId'))
+    viewer_key = f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"
+    # Unknown ids would each hold a 1 KiB sketch in memory until the next flush
+    known_ids = {row.id for row in db.session.query(Post.id).filter(Post.id.in_(post_ids)).all()}
+    post_ids = [post_id for post_id in dict.fromkeys(post_ids) if post_id in known_ids]
+    impression_tracker.record(post_ids, viewer_key)
+
+    return jsonify({'accepted': len(post_ids)}), 202
+
 @bp.route('/<int:id>', methods=['GET'])
+@feed_cache.cached('post:{id}')
 def get_post(id):
     user_id = request.args.get('user_id')
     post = Post.query.get_or_404(id)
-    return jsonify(post.to_dict(current_user_id=user_id))
+    return jsonify(serialize_post(post, current_user_id=user_id))
 
 @bp.route('/user/<int:target_user_id>', methods=['GET'])
+@feed_cache.cached('feed')
 def get_user_posts(target_user_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
@@ -59,7 +240,9 @@ def get_user_posts(target_user_id):
     
     posts_pagination = posts_query.paginate(page=page, per_page=per_page, error_out=False)
     
-    posts = [post.to_dict(current_user_id=current_user_id) for post in posts_pagination.items]
+    posts = serialize_posts(
+        posts_pagination.items, current_user_id=current_user_id, with_comments=_comment_preview_size()
+    )
     
     return jsonify({
         'posts': posts,
@@ -110,7 +293,11 @@ def create_post():
         )
         
         db.session.add(post)
+        db.session.flush()
+        tag_post(post)
+        fan_out_post(post, user)
         db.session.commit()
+        invalidate_post()
         
         return jsonify(post.to_dict()), 201
         
@@ -129,6 +316,7 @@ def delete_post(id):
     
     db.session.delete(post)
     db.session.commit()
+    invalidate_post(id)
     return jsonify({'message': 'Post deleted successfully'})
 
 # Route to serve uploaded files
@@ -143,12 +331,42 @@ def get_comments(post_id):
     from app.models.comment import Comment
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    # First N direct replies inlined under each top-level comment
+    replies_limit = min(max(request.args.get('replies', 3, type=int), 0), 20)
+
+    # Authors are joined into the page query instead of lazy-loaded per comment
+    comments_query = Comment.query.options(joinedload(Comment.user)).filter(
+        Comment.post_id == post_id, Comment.parent_id.is_(None)
+    )
+
+    def serialize_with_replies(items):
+        replies = get_inline_replies([comment.id for comment in items if comment.replies_count], replies_limit)
+        comments = []
+        for comment in items:
+            comment_data = comment.to_dict()
+            comment_data['replies'] = [reply.to_dict() for reply in replies.get(comment.id, [])]
+            comments.append(comment_data)
+        return comments
+
+    # Opt-in keyset mode: ?cursor= (empty for the first page) skips COUNT(*) and OFFSET
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = paginate_by_cursor(comments_query, Comment.created_at, Comment.id, cursor, per_page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-    pagination = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.desc()).paginate(
+        return jsonify({
+            'comments': serialize_with_replies(items),
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        }), 200
+
+    pagination = comments_query.order_by(Comment.created_at.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
-    comments = [comment.to_dict() for comment in pagination.items]
+    comments = serialize_with_replies(pagination.items)
 
     return jsonify({
         'comments': comments,
@@ -159,6 +377,34 @@ def get_comments(post_id):
         'page': page
     }), 200
 
+@bp.route('/<int:post_id>/comments/<int:comment_id>/replies', methods=['GET'])
+def get_comment_replies(post_id, comment_id):
+    from app.models.comment import Comment
+    comment = Comment.query.get_or_404(comment_id)
+
+    if comment.post_id != post_id:
+        return jsonify({'error': 'Comment does not belong to this post'}), 400
+
+    per_page = request.args.get('per_page', 50, type=int)
+    try:
+        replies, next_cursor = get_subtree(comment, request.args.get('cursor'), per_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Whole reply subtree in thread order; depth is relative to the requested comment
+    base_depth = comment_depth(comment)
+    items = []
+    for reply in replies:
+        reply_data = reply.to_dict()
+        reply_data['depth'] = comment_depth(reply) - base_depth
+        items.append(reply_data)
+
+    return jsonify({
+        'replies': items,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }), 200
+
 @bp.route('/<int:post_id>/comments', methods=['POST'])
 def create_comment(post_id):
     try:
@@ -178,14 +424,31 @@ def create_comment(post_id):
         post = Post.query.get_or_404(post_id)
         
         from app.models.comment import Comment
+        parent = None
+        if data.get('parentId') is not None:
+            parent_id = parse_id(data.get('parentId'))
+            parent = Comment.query.get(parent_id) if parent_id else None
+            if not parent or parent.post_id != post_id:
+                return jsonify({'error': 'Parent comment not found on this post'}), 400
+            if comment_depth(parent) >= MAX_REPLY_DEPTH:
+                return jsonify({'error': 'Reply thread is nested too deeply'}), 400
+
         comment = Comment(
             content=content,
             user_id=user_id,
-            post_id=post_id
+            post_id=post_id,
+            parent_id=parent.id if parent else None
         )
         
         db.session.add(comment)
+        # The path embeds the new id, so it is set once the INSERT has assigned one
+        db.session.flush()
+        assign_path(comment, parent)
+        adjust_comments_count(Post, post_id, 1)
+        if parent:
+            adjust_replies_count(parent.id, 1)
         db.session.commit()
+        invalidate_post(post_id)
         
         # Send Comment Push Notification natively
         commenter = User.query.get(user_id)
@@ -209,56 +472,50 @@ def delete_comment(post_id, comment_id):
     if comment.post_id != post_id:
         return jsonify({'error': 'Comment does not belong to this post'}), 400
     
-    db.session.delete(comment)
+    # Replies go with their parent; the post counter drops by the whole subtree
+    removed = delete_subtree(comment)
+    adjust_comments_count(Post, post_id, -removed)
+    if comment.parent_id:
+        adjust_replies_count(comment.parent_id, -1)
     db.session.commit()
+    invalidate_post(post_id)
     
     return jsonify({'message': 'Comment deleted successfully'}), 200
 
 # Like Routes
 
-@bp.route('/<int:post_id>/like', methods=['POST'])
-def toggle_like(post_id):
+def _apply_post_like(post_id, want_liked=None):
+    """
+    Shared body of the post like routes; see apply_like for want_liked. Each write
+    is a single INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING statement.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No input data provided'}), 400
-            
-        user_id = data.get('userId')
-        if not user_id:
-            return jsonify({'error': 'User ID is required'}), 400
+        try:
+            user_id = like_request_user_id(request.get_json(silent=True) or {}, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
         # Verify post exists
         post = Post.query.get_or_404(post_id)
         
-        # Check if already liked
-        existing_like = Like.query.filter_by(post_id=post_id, user_id=str(user_id)).first()
-        
-        if existing_like:
-            # Unlike
-            db.session.delete(existing_like)
-            post.likes = max(0, post.likes - 1)
-            liked = False
-        else:
-            # Like
-            new_like = Like(post_id=post_id, user_id=str(user_id))
-            db.session.add(new_like)
-            post.likes += 1
-            liked = True
+        liked, created, removed = apply_like('post', post_id, user_id, want_liked)
             
-        db.session.commit()
+        if created or removed:
+            record_like_state(user_id, post_id, liked)
+            invalidate_post(post_id)
         
-        if liked:
-            # Send Like Push Notification securely tracking handles
+        if created:
+            # Queue the push; likes on the same post are coalesced into one notification
             liker = User.query.get(user_id)
             target_user = User.query.filter_by(username=post.user_handle).first()
             
             if target_user and liker and target_user.id != liker.id:
-                # Fire and forget execution mapping organically
-                send_like_notification(target_user, liker.full_name or liker.username, post.id)
+                like_notifications.add(target_user.id, post.id, liker.id, liker.full_name or liker.username)
         
         return jsonify({
             'liked': liked, 
-            'likes': post.likes,
+            'changed': created or removed,
+            'likes': max(0, (post.likes or 0) + like_counter.pending('post', post_id)),
             'message': 'Post liked' if liked else 'Post unliked'
         }), 200
         
@@ -266,29 +523,66 @@ def toggle_like(post_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<int:post_id>/like', methods=['POST'])
+def toggle_like(post_id):
+    return _apply_post_like(post_id)
+
+@bp.route('/<int:post_id>/like', methods=['PUT'])
+def like_post(post_id):
+    return _apply_post_like(post_id, want_liked=True)
+
+@bp.route('/<int:post_id>/like', methods=['DELETE'])
+def unlike_post(post_id):
+    return _apply_post_like(post_id, want_liked=False)
+
+@bp.route('/likes/state', methods=['POST'])
+def get_like_states():
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No input data provided'}), 400
+
+    user_id = data.get('userId')
+    post_ids = data.get('postIds')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+    user_id = parse_id(user_id)
+    if not user_id:
+        return jsonify({'error': 'User ID must be an integer'}), 400
+    if not isinstance(post_ids, list) or not all(isinstance(post_id, int) for post_id in post_ids):
+        return jsonify({'error': 'postIds must be a list of integers'}), 400
+
+    max_ids = current_app.config['LIKE_STATE_MAX_IDS']
+    if len(post_ids) > max_ids:
+        return jsonify({'error': f'At most {max_ids} postIds can be requested at once'}), 400
+
+    liked_ids = get_liked_post_ids(post_ids, user_id)
+
+    return jsonify({
+        'userId': user_id,
+        'states': {str(post_id): post_id in liked_ids for post_id in post_ids}
+    }), 200
+
 @bp.route('/<int:post_id>/likes', methods=['GET'])
 def get_post_likes(post_id):
-    from app.models.user import User
+    per_page = request.args.get('per_page', 50, type=int)
+    cursor = request.args.get('cursor')
     try:
         # Verify post exists
         post = Post.query.get_or_404(post_id)
         
-        # Get all likes for this post
-        likes = Like.query.filter_by(post_id=post_id).order_by(Like.created_at.desc()).all()
-        
-        users = []
-        for like in likes:
-            user_id_str = like.user_id
-            if user_id_str and user_id_str.isdigit():
-                user = User.query.get(int(user_id_str))
-                if user:
-                    users.append(user.to_dict())
+        # One page of likers, newest first, from a single likes/users join
+        users, next_cursor = get_likers(Like, Like.post_id, post_id, cursor=cursor, per_page=per_page)
                     
         return jsonify({
             'likes': users,
-            'count': len(users)
+            # Total comes from the denormalized counter, not from counting rows
+            'count': max(0, (post.likes or 0) + like_counter.pending('post', post_id)),
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
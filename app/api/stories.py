@@ -1,71 +1,72 @@
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from app.extensions import db
 from app.models.story import Story
-from app.utils import save_image
+from app.models.story_like import StoryLike
+from app.models.story_view import StoryView
+from app.utils import save_image, conditional_get, parse_id, paginate_by_cursor
+from app.services.counter_service import adjust_comments_count, like_counter
+from app.services.hashtag_service import tag_story
+from app.services.like_service import get_likers, apply_like, like_request_user_id
+from app.services.story_service import (
+    story_cutoff, tray_author_profiles, get_stories_tray, invalidate_story_groups, hydrate_stories,
+    get_story_viewers, story_view_buffer, get_stories_delta, next_sync_token, record_tombstones
+)
 
 bp = Blueprint('stories', __name__)
 
+def _stories_version_stamp(**kwargs):
+    # Creates, deletes and expiry change the count; comments and like counter flushes
+    # touch updated_at, and buffered like deltas bump like_counter.changes. Group names
+    # and images come from the authors' profiles, which no story column tracks, and the
+    # author list follows the viewer's accepted friendships. The tray also carries
+    # hasLiked/seen, so the viewer's story likes and view receipts (stored and still
+    # buffered) count as well.
+    stamp = tuple(db.session.query(func.count(Story.id), func.max(Story.updated_at)).filter(
+        Story.created_at >= story_cutoff()
+    ).one())
+    stamp += (like_counter.changes,)
+    viewer_id = parse_id(request.args.get('user_id'))
+    stamp += tuple(tuple(row) for row in tray_author_profiles(viewer_id))
+    if viewer_id:
+        stamp += tuple(db.session.query(func.count(StoryLike.id), func.max(StoryLike.id)).filter(
+            StoryLike.user_id == viewer_id
+        ).one())
+        stamp += tuple(db.session.query(func.count(StoryView.story_id), func.max(StoryView.created_at)).filter(
+            StoryView.viewer_id == viewer_id
+        ).one())
+        stamp += (story_view_buffer.pending_count(viewer_id),)
+    return stamp
+
 @bp.route('/', methods=['GET'])
+@conditional_get(_stories_version_stamp)
 def get_stories():
     user_id = request.args.get('user_id')
     
-    # We'll fetch stories from the last 24 hours (simplified for now to just fetch all ordered by date)
-    stories_query = Story.query.order_by(Story.created_at.desc())
-    all_stories = stories_query.all()
-    
-    # Group by user handle
-    grouped_stories = {}
-    for story in all_stories:
-        dict_story = story.to_dict(current_user_id=user_id)
-        handle = dict_story['userHandle']
-        if handle not in grouped_stories:
-            grouped_stories[handle] = {
-                'id': handle,
-                'name': dict_story['userName'],
-                'image': dict_story['userImage'],
-                'isLive': True, # Hardcoded for now, could be based on time
-                'stories': []
-            }
-        
-        # Map internal story structure to frontend expected format
-        grouped_stories[handle]['stories'].append({
-            'id': f"story-{dict_story['id']}",
-            # Use raw internal int ID for interactions like 'Liking' a story
-            'raw_id': dict_story['id'],
-            'url': dict_story['storyImage'],
-            'type': 'image',
-            'duration': 5000,
-            'createdAt': dict_story['createdAt'],
-            'likesCount': dict_story.get('likesCount', 0),
-            'hasLiked': dict_story.get('hasLiked', False)
-        })
-        
-    # Convert to list
-    result_list = list(grouped_stories.values())
+    # Delta sync: ?since=<token> returns only what changed after the token was issued
+    since = request.args.get('since')
+    if since:
+        try:
+            delta = get_stories_delta(since, parse_id(user_id))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if delta is not None:
+            return jsonify(dict(delta, full=False)), 200
+        # Token predates the tombstone window; fall through to a full tray
     
-    # Prioritize logged_in_user if user_id is provided
-    if user_id and str(user_id).isdigit():
-        from app.models.user import User
-        current_user = User.query.get(int(user_id))
-        if current_user:
-            current_handle = current_user.username
-            
-            # Find current user in list and move to front
-            current_user_group = None
-            for i, group in enumerate(result_list):
-                if group['id'] == current_handle:
-                    current_user_group = result_list.pop(i)
-                    break
-                    
-            if current_user_group:
-                result_list.insert(0, current_user_group)
+    # Viewer's group first, then accepted friends; groups are cached per author
+    since_token = next_sync_token()
+    result_list = get_stories_tray(parse_id(user_id))
     
     return jsonify({
         'stories': result_list,
         'has_next': False,
         'has_prev': False,
         'total': len(result_list),
-        'pages': 1
+        'pages': 1,
+        'full': True,
+        'since': since_token
     }), 200
 
 @bp.route('', methods=['POST'])
@@ -106,9 +107,12 @@ def create_story():
         )
         
         db.session.add(story)
+        db.session.flush()
+        tag_story(story)
         db.session.commit()
+        invalidate_story_groups([user_handle])
         
-        return jsonify(story.to_dict()), 201
+        return jsonify(hydrate_stories([story])[0]), 201
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -117,45 +121,81 @@ def create_story():
 def delete_story(id):
     story = Story.query.get_or_404(id)
     db.session.delete(story)
+    record_tombstones([story])
     db.session.commit()
+    invalidate_story_groups([story.user_handle])
     return jsonify({'message': 'Story deleted successfully'})
 
+# Story View Routes
+
+@bp.route('/views', methods=['POST'])
+def record_story_views():
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No input data provided'}), 400
+
+    user_id = data.get('userId')
+    story_ids = data.get('storyIds')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+    user_id = parse_id(user_id)
+    if not user_id:
+        return jsonify({'error': 'User ID must be an integer'}), 400
+    if not isinstance(story_ids, list) or not all(isinstance(story_id, int) for story_id in story_ids):
+        return jsonify({'error': 'storyIds must be a list of integers'}), 400
+
+    max_ids = current_app.config['STORY_VIEWS_MAX_IDS']
+    if len(story_ids) > max_ids:
+        return jsonify({'error': f'At most {max_ids} storyIds can be recorded at once'}), 400
+
+    # Buffered and written in batches; duplicates collapse in memory and on conflict
+    story_view_buffer.add(user_id, list(dict.fromkeys(story_ids)))
+
+    return jsonify({'accepted': len(story_ids)}), 202
+
+@bp.route('/<int:story_id>/viewers', methods=['GET'])
+def get_story_viewers_list(story_id):
+    story = Story.query.get_or_404(story_id)
+
+    # Only the owner may see who viewed a story
+    from app.models.user import User
+    viewer = User.query.get(parse_id(request.args.get('user_id')) or 0)
+    if not viewer or viewer.username != story.user_handle:
+        return jsonify({'error': 'Only the story owner can see its viewers'}), 403
+
+    per_page = request.args.get('per_page', 50, type=int)
+    try:
+        viewers, next_cursor = get_story_viewers(story, cursor=request.args.get('cursor'), per_page=per_page)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'viewers': viewers,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }), 200
+
 # Story Like Routes
 
-@bp.route('/<int:story_id>/like', methods=['POST'])
-def toggle_like(story_id):
+def _apply_story_like(story_id, want_liked=None):
+    """
+    Shared body of the story like routes; see apply_like for want_liked.
+    """
     try:
-        from app.models.story_like import StoryLike
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No input data provided'}), 400
-            
-        user_id = data.get('userId')
-        if not user_id:
-            return jsonify({'error': 'User ID is required'}), 400
+        try:
+            user_id = like_request_user_id(request.get_json(silent=True) or {}, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
             
         story = Story.query.get_or_404(story_id)
         
-        # Check if already liked
-        existing_like = StoryLike.query.filter_by(story_id=story_id, user_id=str(user_id)).first()
-        
-        if existing_like:
-            # Unlike
-            db.session.delete(existing_like)
-            story.likes_count = max(0, (story.likes_count or 0) - 1)
-            liked = False
-        else:
-            # Like
-            new_like = StoryLike(story_id=story_id, user_id=str(user_id))
-            db.session.add(new_like)
-            story.likes_count = (story.likes_count or 0) + 1
-            liked = True
-            
-        db.session.commit()
+        # Single-statement writes; the counter only moves when a row really changed
+        liked, created, removed = apply_like('story', story_id, user_id, want_liked)
         
         return jsonify({
             'liked': liked, 
-            'likes': story.likes_count,
+            'changed': created or removed,
+            'likes': max(0, (story.likes_count or 0) + like_counter.pending('story', story_id)),
             'message': 'Story liked' if liked else 'Story unliked'
         }), 200
         
@@ -163,29 +203,39 @@ def toggle_like(story_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<int:story_id>/like', methods=['POST'])
+def toggle_like(story_id):
+    return _apply_story_like(story_id)
+
+@bp.route('/<int:story_id>/like', methods=['PUT'])
+def like_story(story_id):
+    return _apply_story_like(story_id, want_liked=True)
+
+@bp.route('/<int:story_id>/like', methods=['DELETE'])
+def unlike_story(story_id):
+    return _apply_story_like(story_id, want_liked=False)
+
 @bp.route('/<int:story_id>/likes', methods=['GET'])
 def get_story_likes(story_id):
-    from app.models.user import User
     from app.models.story_like import StoryLike
+    per_page = request.args.get('per_page', 50, type=int)
+    cursor = request.args.get('cursor')
     try:
         story = Story.query.get_or_404(story_id)
         
-        # Get all likes for this story
-        likes = StoryLike.query.filter_by(story_id=story_id).order_by(StoryLike.created_at.desc()).all()
-        
-        users = []
-        for like in likes:
-            user_id_str = like.user_id
-            if user_id_str and user_id_str.isdigit():
-                user = User.query.get(int(user_id_str))
-                if user:
-                    users.append(user.to_dict())
+        # One page of likers, newest first, from a single story_likes/users join
+        users, next_cursor = get_likers(StoryLike, StoryLike.story_id, story_id, cursor=cursor, per_page=per_page)
                     
         return jsonify({
             'likes': users,
-            'count': len(users)
+            # Total comes from the denormalized counter, not from counting rows
+            'count': max(0, (story.likes_count or 0) + like_counter.pending('story', story_id)),
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -197,7 +247,24 @@ def get_comments(story_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    pagination = StoryComment.query.filter_by(story_id=story_id).order_by(StoryComment.created_at.desc()).paginate(
+    # Authors are joined into the page query instead of lazy-loaded per comment
+    comments_query = StoryComment.query.options(joinedload(StoryComment.user)).filter_by(story_id=story_id)
+
+    # Opt-in keyset mode: ?cursor= (empty for the first page) skips COUNT(*) and OFFSET
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = paginate_by_cursor(comments_query, StoryComment.created_at, StoryComment.id, cursor, per_page)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'comments': [comment.to_dict() for comment in items],
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        }), 200
+
+    pagination = comments_query.order_by(StoryComment.created_at.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
@@ -238,6 +305,7 @@ def create_comment(story_id):
         )
         
         db.session.add(comment)
+        adjust_comments_count(Story, story_id, 1)
         db.session.commit()
         
         return jsonify(comment.to_dict()), 201
@@ -255,6 +323,7 @@ def delete_comment(story_id, comment_id):
         return jsonify({'error': 'Comment does not belong to this story'}), 400
     
     db.session.delete(comment)
+    adjust_comments_count(Story, story_id, -1)
     db.session.commit()
     
     return jsonify({'message': 'Comment deleted successfully'}), 200
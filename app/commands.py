@@ -0,0 +1,51 @@
+import click
+
+
+def register_commands(app):
+    """Attach maintenance commands to the `flask` CLI."""
+
+    @app.cli.command('reconcile-comment-counts')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows updated per transaction.')
+    def reconcile_comment_counts_command(batch_size):
+        """Repair drift in the denormalized Post/Story comments_count columns."""
+        from app.services.counter_service import reconcile_comment_counts
+
+        repaired = reconcile_comment_counts(batch_size=batch_size)
+        click.echo(f"Repaired {repaired['posts']} posts and {repaired['stories']} stories.")
+
+    @app.cli.command('reconcile-like-counts')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows updated per transaction.')
+    @click.confirmation_option(
+        prompt='Running web servers buffer like deltas this command cannot see, and would '
+               'count them twice. Are the web servers stopped?'
+    )
+    def reconcile_like_counts_command(batch_size):
+        """
+        Recompute Post.likes / Story.likes_count from the like rows. Only while the
+        web servers are stopped; they reconcile themselves every LIKE_RECONCILE_INTERVAL.
+        """
+        from app.services.counter_service import reconcile_like_counts
+
+        repaired = reconcile_like_counts(batch_size=batch_size)
+        click.echo(f"Repaired {repaired['posts']} posts and {repaired['stories']} stories.")
+
+    @app.cli.command('purge-expired-stories')
+    @click.option('--batch-size', default=None, type=int, help='Stories deleted per transaction (default: STORY_PURGE_BATCH_SIZE).')
+    def purge_expired_stories_command(batch_size):
+        """Delete expired stories together with their likes, comments, views and hashtag links."""
+        from app.services.story_service import purge_expired_stories
+
+        purged = purge_expired_stories(batch_size=batch_size)
+        click.echo(f"Purged {purged} expired stories.")
+
+    @app.cli.command('backfill-timelines')
+    @click.option('--batch-size', default=100, show_default=True, help='Authors processed per transaction.')
+    def backfill_timelines_command(batch_size):
+        """Flag high-fan-out authors and copy recent posts into friends' timelines."""
+        from app.services.timeline_service import backfill_timelines
+
+        totals = backfill_timelines(batch_size=batch_size)
+        click.echo(
+            f"Processed {totals['authors']} authors: {totals['pulled']} pulled at read time, "
+            f"{totals['entries']} timeline entries backfilled (existing ones kept)."
+        )
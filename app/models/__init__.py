@@ -7,3 +7,7 @@ from app.models.story import Story
 from app.models.story_like import StoryLike
 from app.models.story_comment import StoryComment
 from app.models.chat import Conversation, Message
+from app.models.timeline import TimelineEntry
+from app.models.hashtag import Hashtag, PostHashtag, StoryHashtag
+from app.models.story_view import StoryView
+from app.models.story_tombstone import StoryTombstone
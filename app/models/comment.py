@@ -7,10 +7,24 @@ class Comment(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Threading: NULL parent_id means a top-level comment
+    parent_id = db.Column(db.Integer, db.ForeignKey('comment.id', ondelete='CASCADE'), nullable=True)
+    # Materialized path: the zero-padded ids of every ancestor and then this comment,
+    # so a whole subtree is one range scan on (post_id, path). See comment_service.
+    path = db.Column(db.String(255), nullable=True)
+    replies_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     user = db.relationship('User', backref=db.backref('comments', lazy=True))
     post = db.relationship('Post', backref=db.backref('comments', lazy=True, cascade="all, delete-orphan"))
+    parent = db.relationship('Comment', remote_side=[id], backref=db.backref('replies', lazy=True, passive_deletes=True))
+
+    # Backs newest-first comment pages for a post, reply lookups and subtree range scans
+    __table_args__ = (
+        db.Index('ix_comment_post_id_created_at', 'post_id', 'created_at'),
+        db.Index('ix_comment_parent_id_created_at', 'parent_id', 'created_at'),
+        db.Index('ix_comment_post_id_path', 'post_id', 'path'),
+    )
 
     def to_dict(self):
         # Handle user relationship safely
@@ -35,6 +49,8 @@ class Comment(db.Model):
             'content': self.content,
             'userId': self.user_id,
             'postId': self.post_id,
+            'parentId': self.parent_id,
+            'repliesCount': self.replies_count or 0,
             'userName': user_name,
             'userHandle': user_handle,
             'userImage': user_image,
@@ -0,0 +1,41 @@
+from app.extensions import db
+from datetime import datetime
+
+class Hashtag(db.Model):
+    __tablename__ = 'hashtag'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # Normalized: lowercase, no leading '#'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'createdAt': self.created_at.isoformat() + 'Z' if self.created_at else None
+        }
+
+class PostHashtag(db.Model):
+    __tablename__ = 'post_hashtag'
+
+    hashtag_id = db.Column(db.Integer, db.ForeignKey('hashtag.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True)
+    # Copied from Post.created_at so a tag page is a single index range scan
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_post_hashtag_tag_created', 'hashtag_id', 'created_at', 'post_id'),
+        db.Index('ix_post_hashtag_post_id', 'post_id'),
+    )
+
+class StoryHashtag(db.Model):
+    __tablename__ = 'story_hashtag'
+
+    hashtag_id = db.Column(db.Integer, db.ForeignKey('hashtag.id', ondelete='CASCADE'), primary_key=True)
+    story_id = db.Column(db.Integer, db.ForeignKey('story.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_story_hashtag_tag_created', 'hashtag_id', 'created_at', 'story_id'),
+        db.Index('ix_story_hashtag_story_id', 'story_id'),
+    )
@@ -1,6 +1,8 @@
 from app.extensions import db
 from datetime import datetime
+from sqlalchemy import event, DDL
 from app.models.like import Like
+from app.utils import parse_id
 
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -12,14 +14,39 @@ class Post(db.Model):
     description = db.Column(db.Text, nullable=True)
     hashtags = db.Column(db.String(255), nullable=True)
     likes = db.Column(db.Integer, default=0)
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Unique viewers: a HyperLogLog sketch (see impression_service) and its last estimate.
+    # The sketch is deferred so feed queries don't load it.
+    views_sketch = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    views_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every row change (likes, counters); feeds the ETag version stamp
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Backs keyset (cursor) pagination of the feed ordered by (created_at, id)
+    __table_args__ = (
+        db.Index('ix_post_created_at_id', 'created_at', 'id'),
+    )
 
     def to_dict(self, current_user_id=None):
         from app.models.user import User
-        from app.models.comment import Comment
 
         user = User.query.filter_by(username=self.user_handle).first()
 
+        has_liked = False
+        viewer_id = parse_id(current_user_id)
+        if viewer_id:
+            like_record = Like.query.filter_by(post_id=self.id, user_id=viewer_id).first()
+            if like_record:
+                has_liked = True
+
+        return self.serialize(user, has_liked)
+
+    def serialize(self, user=None, has_liked=False, pending_likes=0):
+        """
+        Build the API payload from an already-resolved author and like state.
+        pending_likes is the write-behind delta not yet flushed to the likes column.
+        """
         current_user_name = self.user_name
         current_user_image = self.user_image
         gender = None
@@ -29,14 +56,6 @@ class Post(db.Model):
             current_user_image = user.user_image or self.user_image
             gender = user.gender
 
-        has_liked = False
-        if current_user_id:
-            like_record = Like.query.filter_by(post_id=self.id, user_id=str(current_user_id)).first()
-            if like_record:
-                has_liked = True
-                
-        comments_count = Comment.query.filter_by(post_id=self.id).count()
-
         return {
             'id': self.id,
             'userName': current_user_name,
@@ -47,8 +66,37 @@ class Post(db.Model):
             'postImage': self.post_image,
             'description': self.description,
             'hashtags': self.hashtags,
-            'likes': self.likes,
-            'commentsCount': comments_count,
+            'likes': max(0, (self.likes or 0) + pending_likes),
+            'commentsCount': self.comments_count or 0,
+            'viewsCount': self.views_count or 0,
             'hasLiked': has_liked,
             'createdAt': self.created_at.isoformat() + 'Z'
         }
+
+# Full-text search schema that the ORM can't model portably. On Postgres a generated
+# tsvector column with a GIN index; on SQLite (local development) an external-content
+# FTS5 table kept in sync by triggers. Mirrored by the add_post_search migration.
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE post ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(hashtags, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX ix_post_search_vector ON post USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "description, hashtags, content='post', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+    "INSERT INTO post_fts(rowid, description, hashtags) VALUES (new.id, new.description, new.hashtags); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, description, hashtags) VALUES ('delete', old.id, old.description, old.hashtags); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF description, hashtags ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, description, hashtags) VALUES ('delete', old.id, old.description, old.hashtags); "
+    "INSERT INTO post_fts(rowid, description, hashtags) VALUES (new.id, new.description, new.hashtags); END",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Post.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Post.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Post.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS post_fts").execute_if(dialect='sqlite'))
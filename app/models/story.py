@@ -1,5 +1,6 @@
 from app.extensions import db
 from datetime import datetime
+from app.utils import parse_id
 
 class Story(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,7 +12,17 @@ class Story(db.Model):
     description = db.Column(db.Text, nullable=True)
     hashtags = db.Column(db.String(255), nullable=True)
     likes_count = db.Column(db.Integer, default=0)
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every row change (likes, counters); feeds the ETag version stamp
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Expiry filtering and the purge sweeper both range-scan created_at; tray groups
+    # are read per author in (user_handle, created_at) order
+    __table_args__ = (
+        db.Index('ix_story_created_at', 'created_at'),
+        db.Index('ix_story_user_handle_created_at', 'user_handle', 'created_at'),
+    )
 
     def to_dict(self, current_user_id=None):
         from app.models.user import User
@@ -19,6 +30,19 @@ class Story(db.Model):
 
         user = User.query.filter_by(username=self.user_handle).first()
 
+        has_liked = False
+        viewer_id = parse_id(current_user_id)
+        if viewer_id:
+            existing_like = StoryLike.query.filter_by(story_id=self.id, user_id=viewer_id).first()
+            has_liked = bool(existing_like)
+
+        return self.serialize(user, has_liked)
+
+    def serialize(self, user=None, has_liked=False, pending_likes=0):
+        """
+        Build the API payload from an already-resolved author and like state.
+        pending_likes is the write-behind delta not yet flushed to likes_count.
+        """
         current_user_name = self.user_name
         current_user_image = self.user_image
 
@@ -26,11 +50,6 @@ class Story(db.Model):
             current_user_name = user.full_name or user.username
             current_user_image = user.user_image or self.user_image
 
-        has_liked = False
-        if current_user_id:
-            existing_like = StoryLike.query.filter_by(story_id=self.id, user_id=str(current_user_id)).first()
-            has_liked = bool(existing_like)
-
         return {
             'id': self.id,
             'userName': current_user_name,
@@ -40,7 +59,8 @@ class Story(db.Model):
             'storyImage': self.story_image,
             'description': self.description,
             'hashtags': self.hashtags,
-            'likesCount': self.likes_count,
+            'likesCount': max(0, (self.likes_count or 0) + pending_likes),
+            'commentsCount': self.comments_count or 0,
             'hasLiked': has_liked,
             'createdAt': self.created_at.isoformat() + 'Z'
         }
@@ -12,6 +12,11 @@ class StoryComment(db.Model):
     user = db.relationship('User', backref=db.backref('story_comments', lazy=True))
     story = db.relationship('Story', backref=db.backref('comments', lazy=True, cascade="all, delete-orphan"))
 
+    # Backs newest-first comment pages for a story
+    __table_args__ = (
+        db.Index('ix_story_comment_story_id_created_at', 'story_id', 'created_at'),
+    )
+
     def to_dict(self):
         # Handle user relationship safely
         user_name = ""
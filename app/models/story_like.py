@@ -5,13 +5,16 @@ class StoryLike(db.Model):
     __tablename__ = 'story_likes'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(50), nullable=False) # Maps to User.username or User.id, depending on auth
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     story_id = db.Column(db.Integer, db.ForeignKey('story.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    user = db.relationship('User')
+
     # Ensure a user can only like a particular story once
     __table_args__ = (
         db.UniqueConstraint('user_id', 'story_id', name='unique_user_story_like'),
+        db.Index('ix_story_likes_story_id_created_at', 'story_id', 'created_at'),
     )
 
     def to_dict(self):
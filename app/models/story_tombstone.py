@@ -0,0 +1,17 @@
+from app.extensions import db
+from datetime import datetime
+
+class StoryTombstone(db.Model):
+    """Record of a deleted or purged story, kept for one expiry window for delta sync."""
+    __tablename__ = 'story_tombstone'
+
+    story_id = db.Column(db.Integer, primary_key=True)
+    user_handle = db.Column(db.String(50), nullable=False)
+    removed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'storyId': self.story_id,
+            'userHandle': self.user_handle,
+            'removedAt': self.removed_at.isoformat() + 'Z'
+        }
@@ -0,0 +1,22 @@
+from app.extensions import db
+from datetime import datetime
+
+class StoryView(db.Model):
+    """View receipt: viewer_id has seen story_id. Written in batches by story_view_buffer."""
+    __tablename__ = 'story_view'
+
+    viewer_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    story_id = db.Column(db.Integer, db.ForeignKey('story.id', ondelete='CASCADE'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Backs the owner's newest-first viewers list; seen lookups use the primary key
+    __table_args__ = (
+        db.Index('ix_story_view_story_created', 'story_id', 'created_at', 'viewer_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'viewerId': self.viewer_id,
+            'storyId': self.story_id,
+            'createdAt': self.created_at.isoformat() + 'Z'
+        }
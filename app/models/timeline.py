@@ -0,0 +1,22 @@
+from app.extensions import db
+from datetime import datetime
+
+class TimelineEntry(db.Model):
+    """Materialized home timeline row: post_id was fanned out to user_id's timeline."""
+    __tablename__ = 'timeline_entry'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True)
+    # Copied from Post.created_at so a timeline page is a single index range scan
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_timeline_entry_user_created', 'user_id', 'created_at', 'post_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'userId': self.user_id,
+            'postId': self.post_id,
+            'createdAt': self.created_at.isoformat() + 'Z'
+        }
@@ -16,6 +16,9 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_seen = db.Column(db.DateTime, nullable=True)
     fcm_token = db.Column(db.String(255), nullable=True)
+    # Set once the user crossed TIMELINE_FANOUT_LIMIT; friends' timelines then pull
+    # their posts at read time instead of receiving fanned-out entries
+    timeline_pull = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
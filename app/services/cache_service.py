@@ -0,0 +1,218 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response, g
+
+
+class LRUCache:
+    """Bounded, thread-safe in-process LRU with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class CacheBackend:
+    """
+    Interface for a cache shared between worker processes (e.g. Redis or Memcached).
+    Values are strings; incr must be atomic across processes.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """Process-local stand-in for a shared backend, used by default and in tests."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, (0, None))[0]) + 1
+            self._data[key] = (str(value), None)
+            return value
+
+
+class ResponseCache:
+    """
+    Two-level cache for JSON read endpoints: a bounded in-process LRU in front of a
+    pluggable shared backend. Keys embed a per-namespace version, so writes
+    invalidate by bumping the version instead of hunting down individual keys.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.ttl = 30
+        self.local = LRUCache()
+        self.backend = InMemoryBackend()
+        self.backend_hits = 0
+        self.misses = 0
+
+    def init_app(self, app, backend=None):
+        self.enabled = app.config.get('FEED_CACHE_ENABLED', True)
+        self.ttl = app.config.get('FEED_CACHE_TTL', 30)
+        self.local = LRUCache(app.config.get('FEED_CACHE_MAX_ENTRIES', 1024), self.ttl)
+        self.backend = backend or app.config.get('FEED_CACHE_BACKEND') or InMemoryBackend()
+
+    def version(self, namespace):
+        return int(self.backend.get(f'version:{namespace}') or 0)
+
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr(f'version:{namespace}')
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        raw = self.backend.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.backend_hits += 1
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        self.backend.set(key, json.dumps(value), self.ttl)
+
+    def make_key(self, namespace):
+        """
+        Build a key from the versioned namespace, the path and the sorted query string.
+        Under conditional_get the request's ETag is part of the key too, so a cached
+        body is only ever served with the ETag it was built for.
+        """
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        etag = g.get('version_etag', '')
+        return f'{namespace}:v{self.version(namespace)}:{etag}:{request.path}?{args}'
+
+    def cached(self, namespace):
+        """
+        Cache successful responses of a GET view. namespace may reference view
+        arguments, e.g. 'post:{id}'. The viewer is part of the key through the
+        query string (user_id).
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+
+                key = self.make_key(namespace.format(**kwargs))
+                entry = self.get(key)
+                if entry is not None:
+                    return current_app.response_class(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    self.set(key, {
+                        'body': response.get_data(as_text=True),
+                        'status': response.status_code,
+                        'mimetype': response.mimetype
+                    })
+                return response
+            return decorated
+        return decorator
+
+    def stats(self):
+        local = self.local.stats()
+        return {
+            'enabled': self.enabled,
+            'local': local,
+            'backendHits': self.backend_hits,
+            'misses': self.misses,
+            'hitRatio': round((local['hits'] + self.backend_hits) / max(1, local['hits'] + local['misses']), 4)
+        }
+
+
+feed_cache = ResponseCache()
+
+
+def invalidate_post(post_id=None):
+    """Invalidate every cached feed page and, if given, the single-post entry."""
+    namespaces = ['feed']
+    if post_id is not None:
+        namespaces.append(f'post:{post_id}')
+    feed_cache.bump(*namespaces)
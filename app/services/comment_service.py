@@ -0,0 +1,112 @@
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models.comment import Comment
+from app.utils import clamp_per_page
+
+# Each path segment is one comment id, zero-padded so that string order equals
+# thread order (parent first, then its replies by id). Digits only, so range
+# comparisons behave the same under any database collation.
+PATH_SEGMENT_WIDTH = 10
+MAX_REPLY_DEPTH = 20
+MAX_COMMENT_PREVIEW = 10
+
+
+def comment_depth(comment):
+    """0 for a top-level comment, 1 for a direct reply, and so on."""
+    return len(comment.path or '') // PATH_SEGMENT_WIDTH - 1
+
+
+def assign_path(comment, parent=None):
+    """Set the materialized path of a flushed comment (its id must be known)."""
+    segment = str(comment.id).zfill(PATH_SEGMENT_WIDTH)
+    comment.path = (parent.path if parent else '') + segment
+
+
+def _path_upper_bound(path):
+    # Every descendant path starts with path, so it sorts before path + 1
+    # (same width); None when path is all nines and there is nothing above it
+    bumped = str(int(path) + 1)
+    return bumped.zfill(len(path)) if len(bumped) <= len(path) else None
+
+
+def _subtree_filter(comment, include_self=True):
+    conditions = [
+        Comment.post_id == comment.post_id,
+        Comment.path >= comment.path if include_self else Comment.path > comment.path,
+    ]
+    upper = _path_upper_bound(comment.path)
+    if upper is not None:
+        conditions.append(Comment.path < upper)
+    return conditions
+
+
+def _first_per_group(group_column, group_ids, limit, order_by, *filters):
+    # ROW_NUMBER() OVER (PARTITION BY group) picks the first `limit` rows of every
+    # group in one query; authors come back joined instead of lazy-loaded per row
+    ranked = db.session.query(
+        Comment.id.label('id'),
+        func.row_number().over(partition_by=group_column, order_by=order_by).label('position')
+    ).filter(group_column.in_(group_ids), *filters).subquery()
+
+    rows = Comment.query.options(joinedload(Comment.user)).join(
+        ranked, ranked.c.id == Comment.id
+    ).filter(ranked.c.position <= limit).order_by(group_column, ranked.c.position).all()
+
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(getattr(row, group_column.key), []).append(row)
+    return grouped
+
+
+def get_inline_replies(parent_ids, limit):
+    """
+    The first `limit` direct replies (oldest first) of each parent in one query.
+    Returns {parent_id: [Comment]}.
+    """
+    if not parent_ids or limit <= 0:
+        return {}
+    return _first_per_group(Comment.parent_id, parent_ids, limit, (Comment.created_at, Comment.id))
+
+
+def get_latest_comments(post_ids, limit):
+    """
+    The latest `limit` top-level comments (newest first) of each post in one query,
+    for comment previews in feed pages. Returns {post_id: [Comment]}.
+    """
+    if not post_ids or limit <= 0:
+        return {}
+    return _first_per_group(
+        Comment.post_id, post_ids, limit, (Comment.created_at.desc(), Comment.id.desc()),
+        Comment.parent_id.is_(None)
+    )
+
+
+def get_subtree(comment, cursor=None, per_page=50):
+    """
+    One page of every descendant of comment in thread order, fetched with a single
+    range scan on the (post_id, path) index. The cursor is the path of the last
+    comment returned. Returns (comments, next_cursor). Raises ValueError for a
+    malformed cursor.
+    """
+    per_page = clamp_per_page(per_page, default=50)
+    query = Comment.query.options(joinedload(Comment.user)).filter(
+        *_subtree_filter(comment, include_self=False)
+    )
+    if cursor:
+        if not cursor.isdigit() or len(cursor) % PATH_SEGMENT_WIDTH:
+            raise ValueError('Invalid cursor')
+        query = query.filter(Comment.path > cursor)
+
+    rows = query.order_by(Comment.path).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = items[-1].path if len(rows) > per_page else None
+    return items, next_cursor
+
+
+def delete_subtree(comment):
+    """
+    Delete comment and all of its replies with one range DELETE in the caller's
+    transaction. Returns the number of comments removed.
+    """
+    return Comment.query.filter(*_subtree_filter(comment)).delete(synchronize_session=False)
@@ -0,0 +1,241 @@
+import time
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from sqlalchemy import func, case, update, bindparam
+from app.extensions import db
+from app.models.post import Post
+from app.models.story import Story
+from app.models.like import Like
+from app.models.story_like import StoryLike
+from app.models.comment import Comment
+from app.models.story_comment import StoryComment
+from app.services.worker_service import BackgroundWorker
+
+
+def adjust_counter(column, row_id, delta):
+    """
+    Apply delta to a denormalized counter column with a single
+    UPDATE ... SET col = col + :delta. Runs inside the caller's session so it commits
+    together with the write it counts, and never drops the counter below zero.
+    """
+    model = column.class_
+    new_value = column + delta
+    model.query.filter(model.id == row_id).update(
+        {column: case((new_value < 0, 0), else_=new_value)},
+        synchronize_session=False
+    )
+
+
+def adjust_comments_count(model, row_id, delta):
+    adjust_counter(model.comments_count, row_id, delta)
+
+
+def adjust_replies_count(comment_id, delta):
+    adjust_counter(Comment.replies_count, comment_id, delta)
+
+
+class LikeCounter(BackgroundWorker):
+    """
+    Write-behind aggregation of like counters. Like/unlike requests only record a
+    delta in memory; a background task folds all pending deltas into the database
+    every LIKE_COUNTER_FLUSH_INTERVAL seconds with one batched
+    UPDATE ... SET likes = likes + :delta, so a viral post no longer serializes every
+    like on its row lock. Like/StoryLike rows stay the source of truth: every
+    LIKE_RECONCILE_INTERVAL seconds the same background task recounts the counters
+    from them, see reconcile().
+    """
+
+    interval_setting = 'LIKE_COUNTER_FLUSH_INTERVAL'
+    interval = 5
+
+    # kind -> (table, counter column name)
+    COUNTERS = {
+        'post': (Post.__table__, 'likes'),
+        'story': (Story.__table__, 'likes_count'),
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.reconcile_interval = 0
+        # Held for a whole flush, so a reconcile never overlaps a half-written flush
+        self._flush_lock = threading.Lock()
+        # Like writes in progress (row committed, delta not yet added) and whether a
+        # reconcile slice is waiting for them to finish
+        self._writers = 0
+        self._reconciling = False
+        self._writers_done = threading.Condition(self._lock)
+        self.flushed_rows = 0
+        # Bumped on every buffered change; response stamps use it because pending
+        # deltas are not visible in any database column yet
+        self.changes = 0
+        self.reconciles = 0
+        self._last_reconcile = time.monotonic()
+
+    def init_app(self, app):
+        super().init_app(app)
+        self.reconcile_interval = app.config.get('LIKE_RECONCILE_INTERVAL', 0)
+
+    def _new_pending(self):
+        return defaultdict(int)
+
+    def _merge_pending(self, current, value):
+        return current + value
+
+    @contextmanager
+    def recording(self):
+        """
+        Wrap a like row write together with its add(), so a reconcile never counts a
+        committed row whose delta is still about to be buffered.
+        """
+        with self._lock:
+            self._writers_done.wait_for(lambda: not self._reconciling)
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._writers -= 1
+                self._writers_done.notify_all()
+
+    def add(self, kind, row_id, delta):
+        """Buffer a counter change. Call only after the Like row change has committed."""
+        with self._lock:
+            self._pending[(kind, row_id)] += delta
+            self.changes += 1
+
+    def pending(self, kind, row_id):
+        """Delta not yet written to the database for this row."""
+        with self._lock:
+            return self._pending.get((kind, row_id), 0)
+
+    def pending_for(self, kind, row_ids):
+        with self._lock:
+            return {row_id: self._pending.get((kind, row_id), 0) for row_id in row_ids}
+
+    def _flush(self, final):
+        # Write all pending deltas, one executemany UPDATE per counter table
+        with self._flush_lock:
+            pending = self._take_pending()
+
+            batches = defaultdict(list)
+            for (kind, row_id), delta in pending.items():
+                if delta:
+                    batches[kind].append({'row_id': row_id, 'delta': delta})
+            if not batches:
+                return 0
+
+            with self._requeue_on_error(pending):
+                for kind, rows in batches.items():
+                    table, column_name = self.COUNTERS[kind]
+                    column = table.c[column_name]
+                    new_value = func.coalesce(column, 0) + bindparam('delta')
+                    db.session.execute(
+                        update(table)
+                        .where(table.c.id == bindparam('row_id'))
+                        .values({column_name: case((new_value < 0, 0), else_=new_value)}),
+                        rows
+                    )
+                db.session.commit()
+
+        flushed = sum(len(rows) for rows in batches.values())
+        self.flushed_rows += flushed
+        return flushed
+
+    @contextmanager
+    def _holding_slice(self, kind, start, end):
+        # Recount one id slice while nothing is being flushed, written or buffered,
+        # then drop the slice's pending deltas: the recount already includes them
+        with self._flush_lock, self._lock:
+            self._reconciling = True
+            try:
+                self._writers_done.wait_for(lambda: self._writers == 0)
+                yield
+                for key in [key for key in self._pending if key[0] == kind and start <= key[1] < end]:
+                    del self._pending[key]
+            finally:
+                self._reconciling = False
+                self._writers_done.notify_all()
+
+    def reconcile(self, batch_size=1000):
+        """
+        Recompute post.likes / story.likes_count from the like rows in id slices.
+        Only the process that owns this buffer can do this safely: run from the
+        web server's background task, not from a separate CLI process.
+        Returns {'posts': repaired, 'stories': repaired}.
+        """
+        repaired = {
+            'posts': _reconcile(
+                Post, Post.likes, Like, Like.post_id, batch_size,
+                hold_slice=lambda start, end: self._holding_slice('post', start, end)
+            ),
+            'stories': _reconcile(
+                Story, Story.likes_count, StoryLike, StoryLike.story_id, batch_size,
+                hold_slice=lambda start, end: self._holding_slice('story', start, end)
+            )
+        }
+        self.reconciles += 1
+        return repaired
+
+    def run_once(self, app):
+        super().run_once(app)
+        now = time.monotonic()
+        if self.reconcile_interval and now - self._last_reconcile >= self.reconcile_interval:
+            self._last_reconcile = now
+            with app.app_context():
+                try:
+                    repaired = self.reconcile()
+                    logging.info(f"Like counters reconciled: {repaired}")
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Like counter reconcile failed: {e}")
+
+    def _stats(self):
+        return {
+            'changes': self.changes,
+            'reconciles': self.reconciles,
+            'flushedRows': self.flushed_rows
+        }
+
+
+like_counter = LikeCounter()
+
+
+def _reconcile(model, counter_column, child_model, fk_column, batch_size, hold_slice=None):
+    actual = db.session.query(func.count(child_model.id)).filter(
+        fk_column == model.id
+    ).correlate(model).scalar_subquery()
+
+    max_id = db.session.query(func.max(model.id)).scalar() or 0
+    repaired = 0
+
+    # Walk the primary key range so each UPDATE only locks a bounded slice of rows
+    for start in range(0, max_id + 1, batch_size):
+        with hold_slice(start, start + batch_size) if hold_slice else nullcontext():
+            repaired += model.query.filter(
+                model.id >= start,
+                model.id < start + batch_size,
+                func.coalesce(counter_column, -1) != actual
+            ).update({counter_column: actual}, synchronize_session=False)
+            db.session.commit()
+
+    return repaired
+
+
+def reconcile_comment_counts(batch_size=1000):
+    """Recompute comments_count for posts and stories from the comment tables."""
+    return {
+        'posts': _reconcile(Post, Post.comments_count, Comment, Comment.post_id, batch_size),
+        'stories': _reconcile(Story, Story.comments_count, StoryComment, StoryComment.story_id, batch_size)
+    }
+
+
+def reconcile_like_counts(batch_size=1000):
+    """
+    Recompute Post.likes and Story.likes_count from the Like/StoryLike rows.
+    Deltas buffered by another process are not visible here and would be added on
+    top at its next flush, so outside the web server only run this while it is
+    stopped; the web server reconciles itself every LIKE_RECONCILE_INTERVAL seconds.
+    """
+    return like_counter.reconcile(batch_size=batch_size)
@@ -0,0 +1,93 @@
+import re
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.post import Post
+from app.models.hashtag import Hashtag, PostHashtag, StoryHashtag
+from app.utils import paginate_by_cursor
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)', re.UNICODE)
+MAX_TAG_LENGTH = 100
+MAX_TAGS_PER_ITEM = 30
+
+
+def normalize_tag(tag):
+    """Lowercase a tag and strip any leading '#'. Returns None for an empty tag."""
+    tag = (tag or '').strip().lstrip('#').lower()
+    return tag[:MAX_TAG_LENGTH] or None
+
+
+def parse_hashtags(hashtags=None, description=None):
+    """
+    Extract normalized, de-duplicated tags from the free-form hashtags field and
+    any #tags in the description. The hashtags field may or may not use '#'.
+    """
+    raw = re.split(r'[\s,#]+', hashtags or '')
+    raw += HASHTAG_PATTERN.findall(description or '')
+
+    tags = []
+    for tag in raw:
+        tag = normalize_tag(re.sub(r'\W', '', tag))
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags[:MAX_TAGS_PER_ITEM]
+
+
+def get_or_create_hashtags(names):
+    """Return Hashtag rows for names with one lookup query, inserting only the missing ones."""
+    if not names:
+        return []
+
+    existing = {tag.name: tag for tag in Hashtag.query.filter(Hashtag.name.in_(names)).all()}
+    for name in names:
+        if name in existing:
+            continue
+        # Savepoint per new tag so a concurrent insert of the same name doesn't abort the post
+        try:
+            with db.session.begin_nested():
+                tag = Hashtag(name=name)
+                db.session.add(tag)
+            existing[name] = tag
+        except IntegrityError:
+            existing[name] = Hashtag.query.filter_by(name=name).one()
+    return [existing[name] for name in names]
+
+
+def tag_post(post):
+    """Index a flushed post's hashtags into post_hashtag within the caller's transaction."""
+    tags = get_or_create_hashtags(parse_hashtags(post.hashtags, post.description))
+    if tags:
+        db.session.execute(insert(PostHashtag), [
+            {'hashtag_id': tag.id, 'post_id': post.id, 'created_at': post.created_at}
+            for tag in tags
+        ])
+    return tags
+
+
+def tag_story(story):
+    """Index a flushed story's hashtags into story_hashtag within the caller's transaction."""
+    tags = get_or_create_hashtags(parse_hashtags(story.hashtags, story.description))
+    if tags:
+        db.session.execute(insert(StoryHashtag), [
+            {'hashtag_id': tag.id, 'story_id': story.id, 'created_at': story.created_at}
+            for tag in tags
+        ])
+    return tags
+
+
+def get_posts_for_tag(tag, cursor=None, per_page=10):
+    """
+    One page of posts carrying tag, newest first, via the (hashtag_id, created_at, post_id)
+    index. Returns (posts, next_cursor). Raises ValueError for a malformed cursor.
+    """
+    hashtag = Hashtag.query.filter_by(name=normalize_tag(tag)).first()
+    if not hashtag:
+        return [], None
+
+    query = Post.query.join(PostHashtag, PostHashtag.post_id == Post.id).filter(
+        PostHashtag.hashtag_id == hashtag.id
+    )
+    return paginate_by_cursor(
+        query, PostHashtag.created_at, PostHashtag.post_id, cursor, per_page,
+        position=lambda post: (post.created_at, post.id)
+    )
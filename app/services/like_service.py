@@ -0,0 +1,118 @@
+from sqlalchemy import delete
+from app.extensions import db
+from app.models.user import User
+from app.models.like import Like
+from app.models.story_like import StoryLike
+from app.services.counter_service import like_counter
+from app.utils import paginate_by_cursor, conflict_insert, parse_id
+
+
+def serialize_liker(row):
+    """Compact user projection for liker lists, much smaller than User.to_dict."""
+    return {
+        'id': row.id,
+        'username': row.username,
+        'fullName': row.full_name,
+        'userImage': row.user_image
+    }
+
+
+def get_likers(like_model, parent_column, parent_id, cursor=None, per_page=50):
+    """
+    One page of users who liked a post or story, newest like first.
+    A single join between the like table and users, keyset-paginated on
+    (like.created_at, like.id) over the (parent, created_at) index.
+    Returns (likers, next_cursor). Raises ValueError for a malformed cursor.
+    """
+    query = db.session.query(
+        User.id, User.username, User.full_name, User.user_image,
+        like_model.created_at.label('liked_at'), like_model.id.label('like_id')
+    ).join(like_model, like_model.user_id == User.id).filter(parent_column == parent_id)
+
+    rows, next_cursor = paginate_by_cursor(
+        query, like_model.created_at, like_model.id, cursor, per_page,
+        position=lambda row: (row.liked_at, row.like_id)
+    )
+    return [serialize_liker(row) for row in rows], next_cursor
+
+
+# kind (as used by like_counter) -> (like model, parent foreign key column)
+LIKE_TABLES = {
+    'post': (Like, Like.post_id),
+    'story': (StoryLike, StoryLike.story_id),
+}
+
+
+def set_like(kind, parent_id, user_id):
+    """
+    Idempotently record a like with one INSERT ... ON CONFLICT DO NOTHING RETURNING id,
+    so concurrent taps can't race into the unique constraint. The write-behind counter
+    is bumped only when a row was actually inserted. Commits; returns True if the like
+    is new.
+    """
+    like_model, parent_column = LIKE_TABLES[kind]
+    statement = conflict_insert(like_model).values(
+        {parent_column.key: parent_id, like_model.user_id.key: user_id}
+    ).on_conflict_do_nothing().returning(like_model.id)
+
+    with like_counter.recording():
+        created = db.session.execute(statement).first() is not None
+        db.session.commit()
+        if created:
+            like_counter.add(kind, parent_id, 1)
+    return created
+
+
+def like_request_user_id(data, args):
+    """
+    The liking user of a like request: userId in the JSON body, or ?user_id= for
+    DELETE clients that send no body. Raises ValueError with the API error message.
+    """
+    user_id = data.get('userId') or args.get('user_id')
+    if not user_id:
+        raise ValueError('User ID is required')
+    user_id = parse_id(user_id)
+    if not user_id:
+        raise ValueError('User ID must be an integer')
+    return user_id
+
+
+def apply_like(kind, parent_id, user_id, want_liked=None):
+    """
+    Shared body of the post and story like routes. want_liked=True/False sets the
+    state idempotently (PUT/DELETE); None toggles it (legacy POST) by trying the
+    unlike first and liking only if there was nothing to remove.
+    Returns (liked, created, removed).
+    """
+    created = removed = False
+    if want_liked is None:
+        removed = unset_like(kind, parent_id, user_id)
+        if not removed:
+            created = set_like(kind, parent_id, user_id)
+        liked = not removed
+    elif want_liked:
+        created = set_like(kind, parent_id, user_id)
+        liked = True
+    else:
+        removed = unset_like(kind, parent_id, user_id)
+        liked = False
+    return liked, created, removed
+
+
+def unset_like(kind, parent_id, user_id):
+    """
+    Idempotently remove a like with one DELETE ... RETURNING id. The write-behind
+    counter is decremented only when a row was actually deleted. Commits; returns True
+    if a like was removed.
+    """
+    like_model, parent_column = LIKE_TABLES[kind]
+    statement = delete(like_model).where(
+        parent_column == parent_id, like_model.user_id == user_id
+    ).returning(like_model.id)
+
+    with like_counter.recording():
+        removed = db.session.execute(statement).first() is not None
+        db.session.commit()
+        if removed:
+            like_counter.add(kind, parent_id, -1)
+    return removed
@@ -1,7 +1,10 @@
 import firebase_admin
 from firebase_admin import credentials, messaging
 import os
+import time
 import logging
+from app.models.user import User
+from app.services.worker_service import BackgroundWorker
 
 try:
     # Try to initialize the firebase admin SDK
@@ -53,19 +56,87 @@ def _send_notification(fcm_token, title, body, data_payload):
         logging.error(f"Error sending FCM notification: {e}")
         return False
 
-def send_like_notification(target_user, from_username, post_id):
-    """Trigger when someone likes a post. Notifies the post owner."""
-    if not target_user or not target_user.fcm_token:
-        return False
-        
-    title = "New Like"
-    body = f"{from_username} liked your post!"
-    data = {
-        "category": "LIKE",
-        "postId": str(post_id)
-    }
-    
-    return _send_notification(target_user.fcm_token, title, body, data)
+def _like_summary(from_username, count):
+    if count <= 1:
+        return f"{from_username} liked your post!"
+    others = count - 1
+    return f"{from_username} and {others} other{'s' if others > 1 else ''} liked your post"
+
+class LikeNotificationAggregator(BackgroundWorker):
+    """
+    Coalesces like pushes per (owner, post). The first like on a post opens a window
+    of LIKE_NOTIFICATION_WINDOW seconds; every like inside it only updates the pending
+    entry, and when the window closes the owner gets one
+    "Alice and 23 others liked your post" push instead of 24.
+    """
+
+    interval_setting = 'LIKE_NOTIFICATION_WINDOW'
+    interval = 60
+
+    def __init__(self):
+        # _pending: (owner_id, post_id) -> [window opened at, latest liker name, set of liker ids]
+        super().__init__()
+        self.likes_received = 0
+        self.notifications_sent = 0
+
+    @property
+    def window(self):
+        return self.interval
+
+    def add(self, owner_id, post_id, liker_id, liker_name):
+        """Record a like for the owner's next coalesced notification about post_id."""
+        with self._lock:
+            self.likes_received += 1
+            entry = self._pending.get((owner_id, post_id))
+            if entry is None:
+                self._pending[(owner_id, post_id)] = [time.monotonic(), liker_name, {liker_id}]
+            else:
+                # Re-likes by the same user inside the window are counted once
+                entry[1] = liker_name
+                entry[2].add(liker_id)
+
+    def _flush(self, final):
+        # Send one notification per entry whose window has closed (all entries at exit)
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            due = {key: entry for key, entry in self._pending.items() if final or entry[0] <= cutoff}
+            for key in due:
+                del self._pending[key]
+        if not due:
+            return 0
+
+        # One query resolves the push tokens of every owner in this batch
+        owner_ids = {owner_id for owner_id, _ in due}
+        owners = {user.id: user for user in User.query.filter(User.id.in_(owner_ids)).all()}
+
+        sent = 0
+        for (owner_id, post_id), (_, liker_name, liker_ids) in due.items():
+            owner = owners.get(owner_id)
+            if not owner or not owner.fcm_token:
+                continue
+            data = {
+                "category": "LIKE",
+                "postId": str(post_id),
+                "count": str(len(liker_ids))
+            }
+            if _send_notification(owner.fcm_token, "New Like", _like_summary(liker_name, len(liker_ids)), data):
+                sent += 1
+
+        self.notifications_sent += sent
+        return sent
+
+    def poll_interval(self):
+        # Poll a few times per window so a notification goes out soon after it closes
+        return max(1, min(self.window / 4, 15))
+
+    def _stats(self):
+        return {
+            'likesReceived': self.likes_received,
+            'notificationsSent': self.notifications_sent,
+            'windowSeconds': self.window
+        }
+
+like_notifications = LikeNotificationAggregator()
 
 def send_comment_notification(target_user, from_username, post_id):
     """Trigger when someone comments on a post."""
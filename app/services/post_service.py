@@ -0,0 +1,120 @@
+import time
+from flask import current_app
+from app.extensions import db
+from app.models.user import User
+from app.models.post import Post
+from app.models.like import Like
+from app.services.counter_service import like_counter
+from app.services.cache_service import LRUCache
+from app.services.comment_service import get_latest_comments
+from app.utils import parse_id
+
+# Per-viewer {post_id: liked} maps. Keys carry a TTL-sized time bucket, so an entry is
+# never reused past LIKE_STATE_CACHE_TTL even though scrolling keeps updating it.
+_like_state_cache = LRUCache(max_entries=10000)
+MAX_CACHED_STATES_PER_VIEWER = 5000
+
+
+def get_authors_by_handle(handles):
+    """Return a {username: User} map for the given handles in a single query."""
+    handles = {handle for handle in handles if handle}
+    if not handles:
+        return {}
+
+    users = User.query.filter(User.username.in_(handles)).all()
+    return {user.username: user for user in users}
+
+
+def _like_state_key(user_id):
+    ttl = current_app.config.get('LIKE_STATE_CACHE_TTL', 0)
+    if ttl <= 0:
+        return None, ttl
+    return f"{user_id}:{int(time.time() // ttl)}", ttl
+
+
+def get_liked_post_ids(post_ids, user_id):
+    """
+    Return the subset of post_ids the given user has liked.
+    Ids whose state is already cached for this viewer are answered from memory; the
+    rest are resolved with one query on the (user_id, post_id) unique index.
+    """
+    user_id = parse_id(user_id)
+    if not user_id or not post_ids:
+        return set()
+
+    key, ttl = _like_state_key(user_id)
+    known = (_like_state_cache.get(key) if key else None) or {}
+    unknown = [post_id for post_id in post_ids if post_id not in known]
+
+    if unknown:
+        rows = db.session.query(Like.post_id).filter(
+            Like.user_id == user_id,
+            Like.post_id.in_(unknown)
+        ).all()
+        liked = {row.post_id for row in rows}
+        if key:
+            known = {} if len(known) > MAX_CACHED_STATES_PER_VIEWER else dict(known)
+            known.update({post_id: post_id in liked for post_id in unknown})
+            _like_state_cache.set(key, known, ttl=ttl)
+        else:
+            known = {post_id: post_id in liked for post_id in unknown}
+
+    return {post_id for post_id in post_ids if known.get(post_id)}
+
+
+def record_like_state(user_id, post_id, liked):
+    """Keep the viewer's cached like state in step with a committed like/unlike."""
+    key, ttl = _like_state_key(parse_id(user_id))
+    known = _like_state_cache.get(key) if key else None
+    if known is not None:
+        known = dict(known)
+        known[post_id] = liked
+        _like_state_cache.set(key, known, ttl=ttl)
+
+
+def fetch_posts_in_order(post_ids):
+    """Load posts with one IN query and return them in the order of post_ids, skipping missing ids."""
+    if not post_ids:
+        return []
+
+    posts_by_id = {post.id: post for post in Post.query.filter(Post.id.in_(post_ids)).all()}
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+
+def serialize_posts(posts, current_user_id=None, with_comments=0):
+    """
+    Serialize a list of posts with a fixed number of queries.
+    Authors and like state are fetched for the whole list at once instead of per
+    post as Post.to_dict does; comment counts are read off the denormalized column.
+    with_comments=N adds the latest N top-level comments of every post as
+    latestComments, fetched for the whole list in one more query.
+    """
+    if not posts:
+        return []
+
+    post_ids = [post.id for post in posts]
+    authors = get_authors_by_handle(post.user_handle for post in posts)
+    liked_ids = get_liked_post_ids(post_ids, current_user_id)
+    pending_likes = like_counter.pending_for('post', post_ids)
+
+    results = [
+        post.serialize(
+            user=authors.get(post.user_handle),
+            has_liked=post.id in liked_ids,
+            pending_likes=pending_likes[post.id]
+        )
+        for post in posts
+    ]
+
+    if with_comments > 0:
+        # Posts without comments can't contribute rows, so leave them out of the IN list
+        latest = get_latest_comments([post.id for post in posts if post.comments_count], with_comments)
+        for result in results:
+            result['latestComments'] = [comment.to_dict() for comment in latest.get(result['id'], [])]
+
+    return results
+
+
+def serialize_post(post, current_user_id=None):
+    """Serialize a single post through the batched path."""
+    return serialize_posts([post], current_user_id=current_user_id)[0]
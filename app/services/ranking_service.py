@@ -0,0 +1,84 @@
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from app.extensions import db
+from app.models.post import Post
+from app.models.user import User
+from app.models.friend import Friend
+from app.services.cache_service import LRUCache
+
+# Scoring weights: a comment is worth more engagement than a like
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+FRIEND_BOOST = 1.5
+
+# Ranked id lists per (viewer, filter); TTL is applied per entry from config
+_ranked_ids_cache = LRUCache(max_entries=4096)
+
+
+def _friend_handles(user_id):
+    if not user_id:
+        return set()
+
+    rows = db.session.query(User.username).join(
+        Friend, Friend.friend_id == User.id
+    ).filter(Friend.user_id == user_id, Friend.status == 'accepted').all()
+    return {row.username for row in rows}
+
+
+def score_candidates(likes, comments, created_at, is_friend, now=None, half_life_hours=12.0):
+    """
+    Vectorized engagement score for a window of posts:
+    (1 + log1p(weighted engagement)) * exponential recency decay * friendship boost.
+    All arguments are equal-length sequences; returns a float64 array.
+    """
+    now = np.datetime64(now or datetime.utcnow(), 'us')
+    age_hours = (now - np.asarray(created_at, dtype='datetime64[us]')) / np.timedelta64(1, 'h')
+    age_hours = np.maximum(age_hours, 0.0)
+
+    engagement = np.log1p(
+        np.asarray(likes, dtype=np.float64) * LIKE_WEIGHT +
+        np.asarray(comments, dtype=np.float64) * COMMENT_WEIGHT
+    )
+    decay = np.exp2(-age_hours / half_life_hours)
+    boost = np.where(np.asarray(is_friend, dtype=bool), FRIEND_BOOST, 1.0)
+
+    return (1.0 + engagement) * decay * boost
+
+
+def get_ranked_post_ids(posts_query, user_id=None, cache_key=None):
+    """
+    Rank the most recent window of posts matched by posts_query.
+    Candidates come from one query on the (created_at, id) index and are scored in
+    a single NumPy pass. Results are cached per cache_key for RANKED_FEED_TTL seconds
+    so that paging through a ranked feed does not re-rank.
+    """
+    if cache_key is not None:
+        cached = _ranked_ids_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    config = current_app.config
+    rows = posts_query.with_entities(
+        Post.id, Post.user_handle, Post.likes, Post.comments_count, Post.created_at
+    ).order_by(Post.created_at.desc(), Post.id.desc()).limit(config['RANKED_FEED_CANDIDATES']).all()
+
+    if not rows:
+        ranked_ids = []
+    else:
+        friend_handles = _friend_handles(user_id)
+        ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+        scores = score_candidates(
+            likes=[row.likes or 0 for row in rows],
+            comments=[row.comments_count or 0 for row in rows],
+            created_at=[row.created_at for row in rows],
+            is_friend=[row.user_handle in friend_handles for row in rows],
+            half_life_hours=config['RANKED_FEED_HALF_LIFE_HOURS']
+        )
+        # Highest score first; ties go to the newer post
+        order = np.lexsort((-ids, -scores))
+        ranked_ids = ids[order].tolist()
+
+    if cache_key is not None:
+        _ranked_ids_cache.set(cache_key, ranked_ids, ttl=config['RANKED_FEED_TTL'])
+    return ranked_ids
@@ -0,0 +1,77 @@
+import re
+import base64
+from sqlalchemy import text
+from app.extensions import db
+from app.utils import clamp_per_page
+
+
+def _encode_rank_cursor(rank, post_id):
+    raw = f"{rank!r}|{post_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_rank_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, post_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return float(rank), int(post_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+_POSTGRES_SEARCH = """
+    SELECT post.id AS id, ts_rank(post.search_vector, query) AS rank
+    FROM post, websearch_to_tsquery('english', :q) AS query
+    WHERE post.search_vector @@ query {after}
+    ORDER BY rank DESC, post.id DESC
+    LIMIT :limit
+"""
+
+# bm25() is lower-is-better, so negate it to share the "higher rank first" cursor logic
+_SQLITE_SEARCH = """
+    SELECT id, rank FROM (
+        SELECT post_fts.rowid AS id, -bm25(post_fts) AS rank
+        FROM post_fts WHERE post_fts MATCH :q
+    ) WHERE 1 = 1 {after}
+    ORDER BY rank DESC, id DESC
+    LIMIT :limit
+"""
+
+
+def _fts5_query(q):
+    # Quote every term so user input can't inject FTS5 query syntax; terms are ANDed
+    return ' '.join(f'"{term}"' for term in re.findall(r'\w+', q, re.UNICODE))
+
+
+def search_post_ids(q, cursor=None, per_page=10):
+    """
+    Ranked full-text search over post descriptions and hashtags.
+    Uses the tsvector/GIN index on Postgres and the FTS5 table on SQLite.
+    Returns (post_ids, next_cursor) with ids in rank order. Raises ValueError for a
+    malformed cursor.
+    """
+    per_page = clamp_per_page(per_page)
+    params = {'q': q, 'limit': per_page + 1}
+    if db.session.get_bind().dialect.name == 'postgresql':
+        statement = _POSTGRES_SEARCH
+        rank_expr, id_expr = "ts_rank(post.search_vector, query)", "post.id"
+    else:
+        params['q'] = _fts5_query(q)
+        if not params['q']:
+            return [], None
+        statement = _SQLITE_SEARCH
+        rank_expr, id_expr = "rank", "id"
+
+    after = ""
+    if cursor:
+        params['rank'], params['after_id'] = _decode_rank_cursor(cursor)
+        after = f"AND ({rank_expr} < :rank OR ({rank_expr} = :rank AND {id_expr} < :after_id))"
+
+    rows = db.session.execute(text(statement.format(after=after)), params).fetchall()
+    page = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = _encode_rank_cursor(page[-1].rank, page[-1].id)
+
+    return [row.id for row in page], next_cursor
@@ -0,0 +1,491 @@
+import base64
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_
+from app.extensions import db
+from app.models.user import User
+from app.models.friend import Friend
+from app.models.story import Story
+from app.models.story_like import StoryLike
+from app.models.story_comment import StoryComment
+from app.models.story_view import StoryView
+from app.models.story_tombstone import StoryTombstone
+from app.models.hashtag import StoryHashtag
+from app.services.cache_service import LRUCache
+from app.services.post_service import get_authors_by_handle
+from app.services.counter_service import like_counter
+from app.services.like_service import serialize_liker
+from app.services.worker_service import BackgroundWorker
+from app.utils import parse_id, paginate_by_cursor, conflict_insert
+
+# handle -> that author's viewer-independent tray group, shared by every viewer
+_story_group_cache = LRUCache(max_entries=10000)
+SYNC_TOKEN_OVERLAP_SECONDS = 5
+
+
+def story_ttl():
+    return timedelta(hours=current_app.config.get('STORY_TTL_HOURS', 24))
+
+
+def story_cutoff():
+    """Stories created before this moment have expired (STORY_TTL_HOURS ago)."""
+    return datetime.utcnow() - story_ttl()
+
+
+def active_stories():
+    """Query of unexpired stories; the created_at index keeps it a range scan."""
+    return Story.query.filter(Story.created_at >= story_cutoff())
+
+
+def invalidate_story_groups(handles):
+    """Drop cached tray groups after a story of theirs was created, deleted or expired."""
+    for handle in set(handles):
+        _story_group_cache.delete(handle)
+
+
+def _tray_users_filter(viewer_id):
+    friend_ids = db.session.query(Friend.friend_id).filter(
+        Friend.user_id == viewer_id,
+        Friend.status == 'accepted'
+    )
+    return or_(User.id == viewer_id, User.id.in_(friend_ids))
+
+
+def _tray_handles(viewer_id):
+    """The viewer's handle and their accepted friends' handles, in one query."""
+    rows = db.session.query(User.id, User.username).filter(_tray_users_filter(viewer_id)).all()
+    viewer_handle = next((row.username for row in rows if row.id == viewer_id), None)
+    return viewer_handle, [row.username for row in rows]
+
+
+def tray_author_profiles(viewer_id=None):
+    """
+    (id, username, full_name, user_image) of every author the viewer's tray can show,
+    in one query: the viewer and their accepted friends, or every author with an
+    active story for anonymous viewers.
+    """
+    query = db.session.query(User.id, User.username, User.full_name, User.user_image)
+    if viewer_id:
+        query = query.filter(_tray_users_filter(viewer_id))
+    else:
+        query = query.filter(User.username.in_(
+            db.session.query(Story.user_handle).filter(Story.created_at >= story_cutoff())
+        ))
+    return query.order_by(User.id).all()
+
+
+def hydrate_stories(stories, current_user_id=None):
+    """
+    Serialize a list of stories with at most two queries: authors for the whole list
+    by handle and the viewer's like state for the whole list, instead of the two
+    queries per story that Story.to_dict runs. Unflushed like deltas are added to
+    likesCount.
+    """
+    if not stories:
+        return []
+
+    story_ids = [story.id for story in stories]
+    authors = get_authors_by_handle(story.user_handle for story in stories)
+    liked_ids = get_liked_story_ids(story_ids, current_user_id)
+    pending = like_counter.pending_for('story', story_ids)
+    return [
+        story.serialize(
+            user=authors.get(story.user_handle),
+            has_liked=story.id in liked_ids,
+            pending_likes=pending.get(story.id, 0)
+        )
+        for story in stories
+    ]
+
+
+def _story_entry(dict_story):
+    # Viewer-independent part of a tray story; hasLiked, seen and the counters are
+    # added per request
+    return {
+        'id': f"story-{dict_story['id']}",
+        # Use raw internal int ID for interactions like 'Liking' a story
+        'raw_id': dict_story['id'],
+        'url': dict_story['storyImage'],
+        'type': 'image',
+        'duration': 5000,
+        'createdAt': dict_story['createdAt']
+    }
+
+
+def _group_stories(stories, handles=()):
+    """
+    Group stories (ordered by user_handle, newest first) into tray groups, hydrated
+    with one author query. Like state is per viewer, so it is not part of a group,
+    and name/image hold the newest story's own copy, used when the author is gone;
+    the current profile is resolved per request.
+    Handles without stories get an empty group.
+    """
+    groups = {handle: {'id': handle, 'name': None, 'image': None, 'stories': []} for handle in handles}
+    for story, dict_story in zip(stories, hydrate_stories(stories)):
+        group = groups.setdefault(story.user_handle, {'id': story.user_handle, 'name': None, 'image': None, 'stories': []})
+        if not group['stories']:
+            group['name'] = story.user_name
+            group['image'] = story.user_image
+        # (created_at, entry) pairs, newest first
+        group['stories'].append((story.created_at, _story_entry(dict_story)))
+    return groups
+
+
+def _build_groups(handles):
+    """
+    Tray groups for handles from one query ordered by (user_handle, created_at).
+    Authors without active stories get an empty group so the miss is cached too.
+    """
+    stories = active_stories().filter(Story.user_handle.in_(handles)).order_by(
+        Story.user_handle, Story.created_at.desc()
+    ).all()
+    return _group_stories(stories, handles)
+
+
+def _viewer_scope(viewer_id):
+    """(viewer handle, handles in the viewer's tray); handles is None for anonymous viewers."""
+    if viewer_id:
+        return _tray_handles(viewer_id)
+    return None, None
+
+
+def _finish_tray(groups, viewer_id, viewer_handle):
+    """
+    Drop expired stories, add the viewer's like and seen state, the current counters
+    and the authors' current names and images with one query each plus the unflushed
+    like deltas, and order the groups for display.
+    """
+    # A cached group can outlive one of its stories, so expiry is re-checked here
+    cutoff = story_cutoff()
+    candidate_ids = [
+        entry['raw_id'] for group in groups for created_at, entry in group['stories'] if created_at >= cutoff
+    ]
+    # Counters change without invalidating the cached groups (comments, like counter
+    # flushes), so they are read fresh; a story deleted since its group was cached is
+    # missing here and dropped
+    counters = {
+        row.id: row for row in db.session.query(Story.id, Story.likes_count, Story.comments_count).filter(
+            Story.id.in_(candidate_ids)
+        ).all()
+    } if candidate_ids else {}
+
+    visible = []
+    for group in groups:
+        stories = [
+            entry for created_at, entry in group['stories']
+            if created_at >= cutoff and entry['raw_id'] in counters
+        ]
+        if stories:
+            visible.append((group, stories))
+
+    story_ids = [entry['raw_id'] for _, stories in visible for entry in stories]
+    liked_ids = get_liked_story_ids(story_ids, viewer_id)
+    seen_ids = get_seen_story_ids(story_ids, viewer_id)
+    pending = like_counter.pending_for('story', story_ids)
+    # Profile edits don't touch cached groups, so names and images are resolved here
+    authors = get_authors_by_handle(group['id'] for group, _ in visible)
+
+    tray = []
+    for group, stories in visible:
+        author = authors.get(group['id'])
+        tray.append({
+            'id': group['id'],
+            'name': (author.full_name or author.username) if author else group['name'],
+            'image': (author.user_image or group['image']) if author else group['image'],
+            'isLive': True, # Hardcoded for now, could be based on time
+            'allSeen': all(entry['raw_id'] in seen_ids for entry in stories),
+            'stories': [
+                dict(
+                    entry,
+                    likesCount=max(0, (counters[entry['raw_id']].likes_count or 0) + pending[entry['raw_id']]),
+                    commentsCount=counters[entry['raw_id']].comments_count or 0,
+                    hasLiked=entry['raw_id'] in liked_ids,
+                    seen=entry['raw_id'] in seen_ids
+                )
+                for entry in stories
+            ]
+        })
+
+    # Own group first, then groups with unseen stories; within each, newest story first.
+    # Stories are newest first and createdAt is ISO 8601, so the strings sort correctly.
+    tray.sort(key=lambda group: group['stories'][0]['createdAt'], reverse=True)
+    tray.sort(key=lambda group: (group['id'] != viewer_handle, group['allSeen']))
+    return tray
+
+
+def get_stories_tray(viewer_id=None):
+    """
+    The stories tray for a viewer: their own group first, then their accepted
+    friends' groups, unseen before seen and newest first. Groups come from the
+    shared per-author cache and only missing authors are loaded. Without a viewer
+    the tray covers every author with an active story.
+    """
+    viewer_handle, handles = _viewer_scope(viewer_id)
+    if handles is None:
+        handles = [row.user_handle for row in db.session.query(Story.user_handle).filter(
+            Story.created_at >= story_cutoff()
+        ).distinct().all()]
+
+    groups = {}
+    missing = []
+    for handle in handles:
+        group = _story_group_cache.get(handle)
+        if group is None:
+            missing.append(handle)
+        else:
+            groups[handle] = group
+
+    if missing:
+        ttl = current_app.config.get('STORY_TRAY_CACHE_TTL', 30)
+        for handle, group in _build_groups(missing).items():
+            _story_group_cache.set(handle, group, ttl=ttl)
+            groups[handle] = group
+
+    return _finish_tray(groups.values(), viewer_id, viewer_handle)
+
+
+def encode_sync_token(moment):
+    """Opaque delta-sync token for a point in time."""
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip('=')
+
+
+def decode_sync_token(token):
+    """Raises ValueError if token is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return datetime.fromisoformat(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid since token')
+
+
+def next_sync_token():
+    # Step back a little so stories committed just after their created_at was
+    # stamped are still picked up next time; clients de-duplicate by raw_id
+    return encode_sync_token(datetime.utcnow() - timedelta(seconds=SYNC_TOKEN_OVERLAP_SECONDS))
+
+
+def get_stories_delta(since_token, viewer_id=None):
+    """
+    Changes to the viewer's tray since since_token: groups holding only the stories
+    added since then, ids of stories that expired or were deleted, and a new token.
+    Returns None when the token is older than the expiry window (tombstones are gone),
+    in which case the client needs the full tray. Raises ValueError for a bad token.
+    """
+    since = decode_sync_token(since_token)
+    cutoff = story_cutoff()
+    if since < cutoff:
+        return None
+    token = next_sync_token()
+
+    viewer_handle, handles = _viewer_scope(viewer_id)
+
+    added_query = active_stories().filter(Story.created_at > since)
+    # Still-present stories that crossed the expiry line since the last sync
+    expired_query = db.session.query(Story.id).filter(
+        Story.created_at >= since - story_ttl(),
+        Story.created_at < cutoff
+    )
+    tombstone_query = db.session.query(StoryTombstone.story_id).filter(StoryTombstone.removed_at > since)
+    if handles is not None:
+        added_query = added_query.filter(Story.user_handle.in_(handles))
+        expired_query = expired_query.filter(Story.user_handle.in_(handles))
+        tombstone_query = tombstone_query.filter(StoryTombstone.user_handle.in_(handles))
+
+    added = added_query.order_by(Story.user_handle, Story.created_at.desc()).all()
+    removed = {row.id for row in expired_query.all()} | {row.story_id for row in tombstone_query.all()}
+
+    return {
+        'stories': _finish_tray(_group_stories(added).values(), viewer_id, viewer_handle) if added else [],
+        'removed': sorted(removed),
+        'since': token
+    }
+
+
+def record_tombstones(stories):
+    """Remember removed stories for delta sync, in the caller's transaction."""
+    if stories:
+        db.session.execute(conflict_insert(StoryTombstone).on_conflict_do_nothing(), [
+            {'story_id': story.id, 'user_handle': story.user_handle} for story in stories
+        ])
+
+
+def get_liked_story_ids(story_ids, user_id):
+    """Return the subset of story_ids the viewer has liked, in one query."""
+    user_id = parse_id(user_id)
+    if not user_id or not story_ids:
+        return set()
+
+    rows = db.session.query(StoryLike.story_id).filter(
+        StoryLike.user_id == user_id,
+        StoryLike.story_id.in_(story_ids)
+    ).all()
+    return {row.story_id for row in rows}
+
+
+def get_seen_story_ids(story_ids, viewer_id):
+    """
+    Return the subset of story_ids the viewer has seen: one query on the story_view
+    primary key plus views still waiting in the write buffer.
+    """
+    viewer_id = parse_id(viewer_id)
+    if not viewer_id or not story_ids:
+        return set()
+
+    rows = db.session.query(StoryView.story_id).filter(
+        StoryView.viewer_id == viewer_id,
+        StoryView.story_id.in_(story_ids)
+    ).all()
+    return {row.story_id for row in rows} | story_view_buffer.pending_for(viewer_id, story_ids)
+
+
+def get_story_viewers(story, cursor=None, per_page=50):
+    """
+    One page of the users who viewed story, most recent view first, from a single
+    story_view/users join on the (story_id, created_at) index. The owner's own views
+    are left out. Returns (viewers, next_cursor). Raises ValueError for a malformed cursor.
+    """
+    query = db.session.query(
+        User.id, User.username, User.full_name, User.user_image,
+        StoryView.created_at.label('viewed_at')
+    ).join(StoryView, StoryView.viewer_id == User.id).filter(
+        StoryView.story_id == story.id,
+        User.username != story.user_handle
+    )
+
+    rows, next_cursor = paginate_by_cursor(
+        query, StoryView.created_at, StoryView.viewer_id, cursor, per_page,
+        position=lambda row: (row.viewed_at, row.id)
+    )
+    return [dict(serialize_liker(row), viewedAt=row.viewed_at.isoformat() + 'Z') for row in rows], next_cursor
+
+
+class StoryViewBuffer(BackgroundWorker):
+    """
+    Batches story view receipts. Views are de-duplicated per (viewer, story) in memory
+    and a background task bulk-inserts them every STORY_VIEW_FLUSH_INTERVAL seconds
+    with INSERT ... ON CONFLICT DO NOTHING, instead of one synchronous write per view.
+    """
+
+    interval_setting = 'STORY_VIEW_FLUSH_INTERVAL'
+    interval = 5
+    FLUSH_BATCH_SIZE = 1000
+
+    def __init__(self):
+        # _pending: (viewer_id, story_id) -> first time the view was reported
+        super().__init__()
+        self.views_received = 0
+        self.flushed_rows = 0
+
+    def add(self, viewer_id, story_ids):
+        now = datetime.utcnow()
+        with self._lock:
+            for story_id in story_ids:
+                self._pending.setdefault((viewer_id, story_id), now)
+            self.views_received += len(story_ids)
+
+    def pending_for(self, viewer_id, story_ids):
+        with self._lock:
+            return {story_id for story_id in story_ids if (viewer_id, story_id) in self._pending}
+
+    def pending_count(self, viewer_id):
+        """Receipts reported by viewer_id that are not in the database yet."""
+        with self._lock:
+            return sum(1 for pending_viewer, _ in self._pending if pending_viewer == viewer_id)
+
+    def _flush(self, final):
+        pending = self._take_pending()
+        if not pending:
+            return 0
+
+        with self._requeue_on_error(pending):
+            # Drop views of stories or users that no longer exist so a purged story
+            # can't fail the whole batch on its foreign key
+            story_ids = {story_id for _, story_id in pending}
+            viewer_ids = {viewer_id for viewer_id, _ in pending}
+            live_stories = {row.id for row in db.session.query(Story.id).filter(Story.id.in_(story_ids)).all()}
+            live_viewers = {row.id for row in db.session.query(User.id).filter(User.id.in_(viewer_ids)).all()}
+
+            rows = [
+                {'viewer_id': viewer_id, 'story_id': story_id, 'created_at': viewed_at}
+                for (viewer_id, story_id), viewed_at in pending.items()
+                if story_id in live_stories and viewer_id in live_viewers
+            ]
+            statement = conflict_insert(StoryView).on_conflict_do_nothing()
+            for start in range(0, len(rows), self.FLUSH_BATCH_SIZE):
+                db.session.execute(statement, rows[start:start + self.FLUSH_BATCH_SIZE])
+            db.session.commit()
+
+        self.flushed_rows += len(rows)
+        return len(rows)
+
+    def _stats(self):
+        return {
+            'viewsReceived': self.views_received,
+            'flushedRows': self.flushed_rows
+        }
+
+
+story_view_buffer = StoryViewBuffer()
+
+
+def purge_expired_stories(batch_size=None):
+    """
+    Delete expired stories with their likes, comments, views and hashtag links, one
+    bounded batch per transaction so no single DELETE holds locks for long, leaving a
+    tombstone for delta sync. Returns the number of stories removed.
+    """
+    batch_size = batch_size or current_app.config.get('STORY_PURGE_BATCH_SIZE', 500)
+    cutoff = story_cutoff()
+    purged = 0
+
+    while True:
+        rows = db.session.query(Story.id, Story.user_handle).filter(
+            Story.created_at < cutoff
+        ).order_by(Story.created_at).limit(batch_size).all()
+        if not rows:
+            break
+        story_ids = [row.id for row in rows]
+
+        # Children first; Core deletes don't go through the ORM cascades
+        for model, column in ((StoryLike, StoryLike.story_id),
+                              (StoryComment, StoryComment.story_id),
+                              (StoryHashtag, StoryHashtag.story_id),
+                              (StoryView, StoryView.story_id)):
+            model.query.filter(column.in_(story_ids)).delete(synchronize_session=False)
+        Story.query.filter(Story.id.in_(story_ids)).delete(synchronize_session=False)
+        record_tombstones(rows)
+        db.session.commit()
+        invalidate_story_groups(row.user_handle for row in rows)
+
+        purged += len(story_ids)
+        if len(story_ids) < batch_size:
+            break
+
+    # Tombstones only need to outlive the oldest token delta sync still accepts
+    StoryTombstone.query.filter(StoryTombstone.removed_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+
+    return purged
+
+
+class StorySweeper(BackgroundWorker):
+    """Background task that purges expired stories every STORY_PURGE_INTERVAL seconds."""
+
+    interval_setting = 'STORY_PURGE_INTERVAL'
+    interval = 300
+    flush_on_exit = False
+
+    def __init__(self):
+        super().__init__()
+        self.purged = 0
+
+    def _flush(self, final):
+        purged = purge_expired_stories()
+        self.purged += purged
+        return purged
+
+    def _stats(self):
+        return {'purged': self.purged}
+
+
+story_sweeper = StorySweeper()
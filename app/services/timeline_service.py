@@ -0,0 +1,153 @@
+from flask import current_app
+from sqlalchemy import insert, tuple_
+from app.extensions import db
+from app.models.post import Post
+from app.models.user import User
+from app.models.friend import Friend
+from app.models.timeline import TimelineEntry
+from app.utils import encode_cursor, decode_cursor, clamp_per_page, conflict_insert
+
+
+def _accepted_friend_ids_query(user_id):
+    # Accepting a request stores a reciprocal row, so one direction is enough
+    return db.session.query(Friend.friend_id).filter(
+        Friend.user_id == user_id,
+        Friend.status == 'accepted'
+    )
+
+
+def fan_out_post(post, author):
+    """
+    Push a freshly flushed post into the timeline of every accepted friend of its author.
+    Authors above TIMELINE_FANOUT_LIMIT are flagged with timeline_pull and from then
+    on merged at read time instead. Returns the number of timelines written.
+    """
+    if not author or author.timeline_pull:
+        return 0
+
+    friend_ids = [row.friend_id for row in _accepted_friend_ids_query(author.id).all()]
+    if len(friend_ids) > current_app.config['TIMELINE_FANOUT_LIMIT']:
+        # Sticky: posts written before this one may already be missing from timelines
+        author.timeline_pull = True
+        return 0
+    if not friend_ids:
+        return 0
+
+    db.session.execute(insert(TimelineEntry), [
+        {'user_id': friend_id, 'post_id': post.id, 'created_at': post.created_at}
+        for friend_id in friend_ids
+    ])
+    return len(friend_ids)
+
+
+def _pulled_friend_handles(user_id):
+    """Handles of the viewer's friends whose posts are not fanned out on write."""
+    rows = db.session.query(User.username).filter(
+        User.id.in_(_accepted_friend_ids_query(user_id)),
+        User.timeline_pull.is_(True)
+    ).all()
+    return [row.username for row in rows]
+
+
+def _recent_posts_query(author, limit):
+    return db.session.query(Post.id, Post.created_at).filter(
+        Post.user_handle == author.username
+    ).order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+
+
+def backfill_friendship(user, friend):
+    """
+    Copy the latest TIMELINE_BACKFILL_POSTS posts of each side of a newly accepted
+    friendship into the other's timeline, in the caller's transaction.
+    Returns the number of rows inserted.
+    """
+    limit = current_app.config['TIMELINE_BACKFILL_POSTS']
+    rows = []
+    for reader, author in ((user, friend), (friend, user)):
+        if not reader or not author or author.timeline_pull:
+            continue
+        rows += [
+            {'user_id': reader.id, 'post_id': row.id, 'created_at': row.created_at}
+            for row in _recent_posts_query(author, limit).all()
+        ]
+    if rows:
+        db.session.execute(conflict_insert(TimelineEntry).on_conflict_do_nothing(), rows)
+    return len(rows)
+
+
+def backfill_timelines(batch_size=100):
+    """
+    Rebuild fan-out state for every author, committing every batch_size authors:
+    flags authors above TIMELINE_FANOUT_LIMIT as timeline_pull and copies the
+    latest TIMELINE_BACKFILL_POSTS posts of everyone else into their friends'
+    timelines. Safe to re-run. Returns {'authors': n, 'pulled': n, 'entries': n}.
+    """
+    fanout_limit = current_app.config['TIMELINE_FANOUT_LIMIT']
+    post_limit = current_app.config['TIMELINE_BACKFILL_POSTS']
+    statement = conflict_insert(TimelineEntry).on_conflict_do_nothing()
+    totals = {'authors': 0, 'pulled': 0, 'entries': 0}
+
+    last_id = 0
+    while True:
+        authors = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not authors:
+            break
+        for author in authors:
+            friend_ids = [row.friend_id for row in _accepted_friend_ids_query(author.id).all()]
+            if len(friend_ids) > fanout_limit:
+                author.timeline_pull = True
+                totals['pulled'] += 1
+                continue
+            posts = _recent_posts_query(author, post_limit).all() if friend_ids else []
+            rows = [
+                {'user_id': friend_id, 'post_id': post.id, 'created_at': post.created_at}
+                for friend_id in friend_ids for post in posts
+            ]
+            if rows:
+                db.session.execute(statement, rows)
+                totals['entries'] += len(rows)
+        db.session.commit()
+        totals['authors'] += len(authors)
+        last_id = authors[-1].id
+    return totals
+
+
+def get_timeline(user_id, cursor=None, per_page=10):
+    """
+    Read one page of the viewer's home timeline ordered by (created_at, id) desc.
+    Fanned-out entries come from a single index range scan; posts by celebrity
+    friends (timeline_pull) are fetched with one more bounded query and merged in.
+    Returns (posts, next_cursor). Raises ValueError for a malformed cursor.
+    """
+    per_page = clamp_per_page(per_page, default=10)
+    position = decode_cursor(cursor) if cursor else None
+
+    fanned_query = Post.query.join(
+        TimelineEntry, TimelineEntry.post_id == Post.id
+    ).filter(TimelineEntry.user_id == user_id)
+    if position:
+        fanned_query = fanned_query.filter(
+            tuple_(TimelineEntry.created_at, TimelineEntry.post_id) < tuple_(*position)
+        )
+    candidates = fanned_query.order_by(
+        TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc()
+    ).limit(per_page + 1).all()
+
+    pulled_handles = _pulled_friend_handles(user_id)
+    if pulled_handles:
+        pulled_query = Post.query.filter(Post.user_handle.in_(pulled_handles))
+        if position:
+            pulled_query = pulled_query.filter(tuple_(Post.created_at, Post.id) < tuple_(*position))
+        candidates += pulled_query.order_by(
+            Post.created_at.desc(), Post.id.desc()
+        ).limit(per_page + 1).all()
+        # An author can cross the fan-out limit after some posts were already fanned out
+        candidates = list({post.id: post for post in candidates}.values())
+        candidates.sort(key=lambda post: (post.created_at, post.id), reverse=True)
+
+    posts = candidates[:per_page]
+    next_cursor = None
+    if len(candidates) > per_page:
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+
+    return posts, next_cursor
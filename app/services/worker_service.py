@@ -0,0 +1,122 @@
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from app.extensions import db, socketio
+
+_start_lock = threading.Lock()
+
+
+def _start_workers(app):
+    # Runs before every request but starts the tasks once; CLI commands
+    # (flask db upgrade, maintenance commands) never serve a request
+    if app.extensions.get('background_workers_started'):
+        return
+    with _start_lock:
+        if app.extensions.get('background_workers_started'):
+            return
+        app.extensions['background_workers_started'] = True
+        for worker in app.extensions['background_workers']:
+            worker.start(app)
+
+
+class BackgroundWorker:
+    """
+    Base for the in-memory write-behind buffers and periodic jobs. A background task
+    calls flush() every `interval` seconds (read from the interval_setting config
+    key) and, if flush_on_exit, once more when the process exits. The tasks start
+    with the first request the web server handles, so `flask` CLI processes never
+    run them. Subclasses implement _flush(final) and may add counters in _stats().
+    """
+
+    interval_setting = None
+    interval = 30
+    flush_on_exit = True
+
+    def __init__(self):
+        self.interval = type(self).interval
+        self._pending = self._new_pending()
+        self._lock = threading.Lock()
+        self.flushes = 0
+
+    def init_app(self, app):
+        self.interval = app.config.get(self.interval_setting, self.interval)
+        workers = app.extensions.setdefault('background_workers', [])
+        if not workers:
+            app.before_request(lambda: _start_workers(app))
+        workers.append(self)
+
+    def start(self, app):
+        socketio.start_background_task(self._run, app)
+        if self.flush_on_exit:
+            atexit.register(self._flush_in_context, app, True)
+
+    def flush(self, final=False):
+        """Write out pending work now; final is set for the last flush at exit. Returns items written."""
+        written = self._flush(final)
+        if written:
+            self.flushes += 1
+        return written
+
+    def _flush(self, final):
+        raise NotImplementedError
+
+    def _new_pending(self):
+        return {}
+
+    def _merge_pending(self, current, value):
+        # How a requeued entry combines with one buffered since; keep the newer by default
+        return current
+
+    def _take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, self._new_pending()
+        return pending
+
+    @contextmanager
+    def _requeue_on_error(self, pending):
+        """Put pending back into the buffer if the block fails, so the next flush retries it."""
+        try:
+            yield
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                for key, value in pending.items():
+                    current = self._pending.get(key)
+                    self._pending[key] = value if current is None else self._merge_pending(current, value)
+            raise
+
+    def queue_size(self):
+        with self._lock:
+            return len(self._pending)
+
+    def poll_interval(self):
+        return self.interval
+
+    def run_once(self, app):
+        self._flush_in_context(app)
+
+    def _flush_in_context(self, app, final=False):
+        with app.app_context():
+            try:
+                return self.flush(final)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"{type(self).__name__} flush failed: {e}")
+                return 0
+
+    def _run(self, app):
+        while True:
+            socketio.sleep(self.poll_interval())
+            self.run_once(app)
+
+    def _stats(self):
+        return {}
+
+    def stats(self):
+        return {
+            'pending': self.queue_size(),
+            'flushes': self.flushes,
+            'intervalSeconds': self.interval,
+            **self._stats()
+        }
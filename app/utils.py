@@ -1,9 +1,16 @@
 import os
 import uuid
+import base64
+import hashlib
+from functools import wraps
+from datetime import datetime
 from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, request, make_response, g
 from PIL import Image
 import io
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
 
 import cloudinary
 import cloudinary.uploader
@@ -78,3 +85,104 @@ def save_image(file_storage):
         return None
     
     return None
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING ... RETURNING
+_CONFLICT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def conflict_insert(model):
+    """INSERT for the current database that supports .on_conflict_do_nothing()."""
+    return _CONFLICT_INSERTS[db.session.get_bind().dialect.name](model)
+
+def parse_id(value):
+    """Coerce an id from a query string or JSON body to int. Returns None if it isn't one."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) keyset position as an opaque URL-safe token."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a token produced by encode_cursor back into (created_at, id).
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+MAX_PER_PAGE = 100
+
+def clamp_per_page(per_page, default=20):
+    """
+    Sanitize a client-supplied page size the way paginate() does: a missing or
+    non-positive value falls back to default, and anything above MAX_PER_PAGE is capped.
+    """
+    if not per_page or per_page < 1:
+        return default
+    return min(per_page, MAX_PER_PAGE)
+
+def paginate_by_cursor(query, created_col, id_col, cursor, per_page, position=None):
+    """
+    Keyset pagination over (created_col, id_col) in descending order.
+    Returns (items, next_cursor). No COUNT(*) and no OFFSET scan, so the cost of
+    a page stays the same however deep the client scrolls.
+    position(item) -> (created_at, id) is needed when the keyset columns live on a
+    joined table rather than on the returned items.
+    """
+    per_page = clamp_per_page(per_page)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_col, id_col) < tuple_(created_at, row_id))
+
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        if position:
+            next_cursor = encode_cursor(*position(last))
+        else:
+            next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+
+    return items, next_cursor
+
+def conditional_get(stamp_fn):
+    """
+    Add a strong ETag to a GET view and answer If-None-Match with 304 Not Modified.
+    stamp_fn(**view_kwargs) returns a cheap version stamp (e.g. max updated_at and a
+    row count); when it matches, the view and its serialization are skipped entirely.
+    A stamp of None disables the check for that request. The ETag is published as
+    g.version_etag so a response cache inside the view can key on it and never
+    serve a body built for another stamp.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            stamp = stamp_fn(**kwargs)
+            if stamp is None:
+                return f(*args, **kwargs)
+
+            etag = hashlib.sha1(f"{request.full_path}|{stamp!r}".encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            g.version_etag = etag
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return decorated
+    return decorator
@@ -9,6 +9,49 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'postgresql://postgres@localhost:5432/funai_dev'
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'app/static/uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max limit
+    # Authors with more accepted friends than this are not fanned out on write;
+    # their posts are merged into friends' timelines at read time instead.
+    TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 1000))
+    # Latest posts per author copied into a timeline when a friendship is accepted
+    # and by `flask backfill-timelines`
+    TIMELINE_BACKFILL_POSTS = int(os.environ.get('TIMELINE_BACKFILL_POSTS', 50))
+    # Feed/post response cache. Without a shared FEED_CACHE_BACKEND each worker keeps
+    # its own copy, so other workers may serve a page up to FEED_CACHE_TTL seconds old.
+    FEED_CACHE_ENABLED = os.environ.get('FEED_CACHE_ENABLED', 'true').lower() == 'true'
+    FEED_CACHE_TTL = int(os.environ.get('FEED_CACHE_TTL', 30))
+    FEED_CACHE_MAX_ENTRIES = int(os.environ.get('FEED_CACHE_MAX_ENTRIES', 1024))
+    FEED_CACHE_BACKEND = None
+    # ?sort=ranked: size of the recent-post window scored per request, how long a
+    # viewer's ranking is reused, and the recency half-life used by the scorer
+    RANKED_FEED_CANDIDATES = int(os.environ.get('RANKED_FEED_CANDIDATES', 500))
+    RANKED_FEED_TTL = int(os.environ.get('RANKED_FEED_TTL', 60))
+    RANKED_FEED_HALF_LIFE_HOURS = float(os.environ.get('RANKED_FEED_HALF_LIFE_HOURS', 12))
+    # Upper bound on ids accepted by GET /api/posts/batch
+    POSTS_BATCH_MAX_IDS = int(os.environ.get('POSTS_BATCH_MAX_IDS', 100))
+    # Buffered like/unlike deltas are written to post.likes / story.likes_count this often
+    LIKE_COUNTER_FLUSH_INTERVAL = float(os.environ.get('LIKE_COUNTER_FLUSH_INTERVAL', 5))
+    # The web server recounts post.likes / story.likes_count from the like rows this
+    # often, in-process so buffered deltas aren't counted twice (0 disables)
+    LIKE_RECONCILE_INTERVAL = float(os.environ.get('LIKE_RECONCILE_INTERVAL', 86400))
+    # Likes on the same post within this many seconds are coalesced into one push
+    LIKE_NOTIFICATION_WINDOW = float(os.environ.get('LIKE_NOTIFICATION_WINDOW', 60))
+    # POST /api/posts/likes/state limit, and how long a viewer's known like states are
+    # reused from memory (0 disables the cache)
+    LIKE_STATE_MAX_IDS = int(os.environ.get('LIKE_STATE_MAX_IDS', 500))
+    LIKE_STATE_CACHE_TTL = int(os.environ.get('LIKE_STATE_CACHE_TTL', 60))
+    # POST /api/posts/impressions limit, and how often unique-viewer sketches are flushed
+    IMPRESSIONS_MAX_IDS = int(os.environ.get('IMPRESSIONS_MAX_IDS', 100))
+    IMPRESSION_FLUSH_INTERVAL = float(os.environ.get('IMPRESSION_FLUSH_INTERVAL', 30))
+    # Stories are hidden after STORY_TTL_HOURS; a sweeper deletes them every
+    # STORY_PURGE_INTERVAL seconds, STORY_PURGE_BATCH_SIZE stories per transaction
+    STORY_TTL_HOURS = float(os.environ.get('STORY_TTL_HOURS', 24))
+    STORY_PURGE_INTERVAL = float(os.environ.get('STORY_PURGE_INTERVAL', 300))
+    STORY_PURGE_BATCH_SIZE = int(os.environ.get('STORY_PURGE_BATCH_SIZE', 500))
+    # How long an author's stories tray group is reused across viewers
+    STORY_TRAY_CACHE_TTL = int(os.environ.get('STORY_TRAY_CACHE_TTL', 30))
+    # POST /api/stories/views limit, and how often buffered view receipts are written
+    STORY_VIEWS_MAX_IDS = int(os.environ.get('STORY_VIEWS_MAX_IDS', 100))
+    STORY_VIEW_FLUSH_INTERVAL = float(os.environ.get('STORY_VIEW_FLUSH_INTERVAL', 5))
 
 class DevelopmentConfig(Config):
     DEBUG = True
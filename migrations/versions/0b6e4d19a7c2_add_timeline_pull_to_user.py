@@ -0,0 +1,26 @@
+"""Add timeline_pull flag to user
+
+Revision ID: 0b6e4d19a7c2
+Revises: f51c7a3e9b06
+Create Date: 2026-10-18 18:02:44.318209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e4d19a7c2'
+down_revision = 'f51c7a3e9b06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timeline_pull', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('timeline_pull')
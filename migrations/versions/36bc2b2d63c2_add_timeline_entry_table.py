@@ -0,0 +1,36 @@
+"""Add timeline_entry table for fan-out home timelines
+
+Revision ID: 36bc2b2d63c2
+Revises: 92df8ef80f99
+Create Date: 2026-10-18 09:41:06.552871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36bc2b2d63c2'
+down_revision = '92df8ef80f99'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timeline_entry',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    with op.batch_alter_table('timeline_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_timeline_entry_user_created', ['user_id', 'created_at', 'post_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('timeline_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_timeline_entry_user_created')
+
+    op.drop_table('timeline_entry')
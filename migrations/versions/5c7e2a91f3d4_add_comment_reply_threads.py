@@ -0,0 +1,55 @@
+"""Add reply threading (parent_id, path, replies_count) to comment
+
+Revision ID: 5c7e2a91f3d4
+Revises: d2a50d8fd72e
+Create Date: 2026-10-18 13:02:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7e2a91f3d4'
+down_revision = 'd2a50d8fd72e'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+PATH_SEGMENT_WIDTH = 10
+
+
+def _backfill_paths():
+    # Existing comments are all top-level, so their path is just their own padded id
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        padded_id = f"lpad(id::text, {PATH_SEGMENT_WIDTH}, '0')"
+    else:
+        padded_id = f"printf('%0{PATH_SEGMENT_WIDTH}d', id)"
+
+    max_id = bind.execute(sa.text('SELECT MAX(id) FROM comment')).scalar() or 0
+    statement = sa.text(f'UPDATE comment SET path = {padded_id} WHERE id >= :start AND id < :end')
+    for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+        bind.execute(statement, {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+
+def upgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('path', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('replies_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_foreign_key('fk_comment_parent_id_comment', 'comment', ['parent_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_index('ix_comment_parent_id_created_at', ['parent_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_comment_post_id_path', ['post_id', 'path'], unique=False)
+
+    _backfill_paths()
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_post_id_path')
+        batch_op.drop_index('ix_comment_parent_id_created_at')
+        batch_op.drop_constraint('fk_comment_parent_id_comment', type_='foreignkey')
+        batch_op.drop_column('replies_count')
+        batch_op.drop_column('path')
+        batch_op.drop_column('parent_id')
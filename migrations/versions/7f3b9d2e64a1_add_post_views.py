@@ -0,0 +1,28 @@
+"""Add views_sketch and views_count to post
+
+Revision ID: 7f3b9d2e64a1
+Revises: 5c7e2a91f3d4
+Create Date: 2026-10-18 14:21:09.364117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3b9d2e64a1'
+down_revision = '5c7e2a91f3d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('views_sketch', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('views_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('views_count')
+        batch_op.drop_column('views_sketch')
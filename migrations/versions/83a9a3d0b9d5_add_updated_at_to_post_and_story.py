@@ -0,0 +1,39 @@
+"""Add updated_at to post and story
+
+Revision ID: 83a9a3d0b9d5
+Revises: 36bc2b2d63c2
+Create Date: 2026-10-18 10:05:37.921448
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '83a9a3d0b9d5'
+down_revision = '36bc2b2d63c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_post_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_story_updated_at'), ['updated_at'], unique=False)
+
+    op.execute('UPDATE post SET updated_at = created_at')
+    op.execute('UPDATE story SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_story_updated_at'))
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_post_updated_at'))
+        batch_op.drop_column('updated_at')
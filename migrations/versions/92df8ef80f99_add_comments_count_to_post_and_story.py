@@ -0,0 +1,53 @@
+"""Add comments_count to post and story
+
+Revision ID: 92df8ef80f99
+Revises: ac012f39e877
+Create Date: 2026-10-18 09:20:43.107562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '92df8ef80f99'
+down_revision = 'ac012f39e877'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _backfill(table, comment_table, fk_column):
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table(comment_table):
+        return
+
+    max_id = bind.execute(sa.text(f'SELECT MAX(id) FROM "{table}"')).scalar() or 0
+    statement = sa.text(
+        f'UPDATE "{table}" SET comments_count = '
+        f'(SELECT COUNT(*) FROM "{comment_table}" WHERE "{comment_table}".{fk_column} = "{table}".id) '
+        f'WHERE id >= :start AND id < :end'
+    )
+    # Backfill in primary key slices to keep each UPDATE short
+    for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+        bind.execute(statement, {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), nullable=False, server_default='0'))
+
+    _backfill('post', 'comment', 'post_id')
+    _backfill('story', 'story_comment', 'story_id')
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_column('comments_count')
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('comments_count')
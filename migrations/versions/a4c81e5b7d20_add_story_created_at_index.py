@@ -0,0 +1,26 @@
+"""Add created_at index to story for expiry filtering
+
+Revision ID: a4c81e5b7d20
+Revises: 7f3b9d2e64a1
+Create Date: 2026-10-18 15:03:52.880451
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c81e5b7d20'
+down_revision = '7f3b9d2e64a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.create_index('ix_story_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_index('ix_story_created_at')
@@ -0,0 +1,26 @@
+"""Add (created_at, id) index to post for keyset pagination
+
+Revision ID: ac012f39e877
+Revises: b025cf208262
+Create Date: 2026-10-18 09:02:11.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ac012f39e877'
+down_revision = 'b025cf208262'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index('ix_post_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_created_at_id')
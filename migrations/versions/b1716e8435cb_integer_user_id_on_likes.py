@@ -0,0 +1,131 @@
+"""Convert likes.user_id and story_likes.user_id to integer foreign keys
+
+Revision ID: b1716e8435cb
+Revises: ec02fe7fb391
+Create Date: 2026-10-18 11:42:09.186530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1716e8435cb'
+down_revision = 'ec02fe7fb391'
+branch_labels = None
+depends_on = None
+
+CONVERSION_BATCH_SIZE = 1000
+RECOUNT_BATCH_SIZE = 1000
+
+# table, parent column, unique constraint, (parent, created_at) index, user FK name
+LIKE_TABLES = [
+    ('likes', 'post_id', 'unique_user_post_like', 'ix_likes_post_id_created_at', 'fk_likes_user_id_user'),
+    ('story_likes', 'story_id', 'unique_user_story_like', 'ix_story_likes_story_id_created_at', 'fk_story_likes_user_id_user'),
+]
+
+# like table -> (parent table, denormalized like counter column)
+LIKE_COUNTERS = {
+    'likes': ('post', 'likes'),
+    'story_likes': ('story', 'likes_count'),
+}
+
+
+def _convert_user_ids(table):
+    """
+    Fill user_id_int from the legacy string column in id-ordered batches.
+    Legacy values are either a numeric user id or a username.
+    """
+    bind = op.get_bind()
+    users = sa.table('user', sa.column('id'), sa.column('username'))
+    likes = sa.table(table, sa.column('id'), sa.column('user_id'), sa.column('user_id_int'))
+    set_user_id = likes.update().where(likes.c.id == sa.bindparam('row_id')).values(user_id_int=sa.bindparam('new_user_id'))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(likes.c.id, likes.c.user_id)
+            .where(likes.c.id > last_id)
+            .order_by(likes.c.id)
+            .limit(CONVERSION_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        usernames = {row.user_id for row in rows if row.user_id and not row.user_id.isdigit()}
+        ids_by_username = {}
+        if usernames:
+            ids_by_username = dict(bind.execute(
+                sa.select(users.c.username, users.c.id).where(users.c.username.in_(usernames))
+            ).fetchall())
+
+        updates = []
+        for row in rows:
+            value = (row.user_id or '').strip()
+            new_user_id = int(value) if value.isdigit() else ids_by_username.get(value)
+            if new_user_id is not None:
+                updates.append({'row_id': row.id, 'new_user_id': new_user_id})
+        if updates:
+            bind.execute(set_user_id, updates)
+        last_id = rows[-1].id
+
+
+def _recount_likes(table, parent_column):
+    """Recompute the parent's like counter from the remaining like rows."""
+    parent_table, counter_column = LIKE_COUNTERS[table]
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text(f'SELECT MAX(id) FROM "{parent_table}"')).scalar() or 0
+    statement = sa.text(
+        f'UPDATE "{parent_table}" SET {counter_column} = '
+        f'(SELECT COUNT(*) FROM "{table}" WHERE "{table}".{parent_column} = "{parent_table}".id) '
+        f'WHERE id >= :start AND id < :end'
+    )
+    # Recount in primary key slices to keep each UPDATE short
+    for start in range(0, max_id + 1, RECOUNT_BATCH_SIZE):
+        bind.execute(statement, {'start': start, 'end': start + RECOUNT_BATCH_SIZE})
+
+
+def upgrade():
+    for table, parent_column, unique_name, index_name, fk_name in LIKE_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('user_id_int', sa.Integer(), nullable=True))
+
+        _convert_user_ids(table)
+
+        # Likes by unknown users can't satisfy the new foreign key, and a user stored
+        # once by id and once by username collapses into a duplicate: keep the oldest
+        op.execute(f'DELETE FROM {table} WHERE user_id_int IS NULL OR user_id_int NOT IN (SELECT id FROM "user")')
+        op.execute(
+            f'DELETE FROM {table} WHERE id NOT IN '
+            f'(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {table} GROUP BY user_id_int, {parent_column}) AS keepers)'
+        )
+        # The deleted rows were counted in post.likes / story.likes_count
+        _recount_likes(table, parent_column)
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(unique_name, type_='unique')
+            batch_op.drop_column('user_id')
+            batch_op.alter_column('user_id_int', new_column_name='user_id', existing_type=sa.Integer(), nullable=False)
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_foreign_key(fk_name, 'user', ['user_id'], ['id'], ondelete='CASCADE')
+            batch_op.create_unique_constraint(unique_name, ['user_id', parent_column])
+            batch_op.create_index(index_name, [parent_column, 'created_at'], unique=False)
+
+
+def downgrade():
+    for table, parent_column, unique_name, index_name, fk_name in reversed(LIKE_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('user_id_str', sa.String(length=50), nullable=True))
+
+        op.execute(f'UPDATE {table} SET user_id_str = CAST(user_id AS VARCHAR(50))')
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(index_name)
+            batch_op.drop_constraint(unique_name, type_='unique')
+            batch_op.drop_constraint(fk_name, type_='foreignkey')
+            batch_op.drop_column('user_id')
+            batch_op.alter_column('user_id_str', new_column_name='user_id', existing_type=sa.String(length=50), nullable=False)
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(unique_name, ['user_id', parent_column])
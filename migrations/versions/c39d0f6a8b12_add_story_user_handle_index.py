@@ -0,0 +1,26 @@
+"""Add (user_handle, created_at) index to story for the stories tray
+
+Revision ID: c39d0f6a8b12
+Revises: a4c81e5b7d20
+Create Date: 2026-10-18 15:47:30.114872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c39d0f6a8b12'
+down_revision = 'a4c81e5b7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.create_index('ix_story_user_handle_created_at', ['user_handle', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('story', schema=None) as batch_op:
+        batch_op.drop_index('ix_story_user_handle_created_at')
@@ -0,0 +1,35 @@
+"""Add (parent, created_at) indexes to comment and story_comment
+
+Revision ID: d2a50d8fd72e
+Revises: b1716e8435cb
+Create Date: 2026-10-18 12:08:27.774019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a50d8fd72e'
+down_revision = 'b1716e8435cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_post_id_created_at', ['post_id', 'created_at'], unique=False)
+
+    # story_comment has historically been created by db.create_all() rather than a migration
+    if sa.inspect(op.get_bind()).has_table('story_comment'):
+        with op.batch_alter_table('story_comment', schema=None) as batch_op:
+            batch_op.create_index('ix_story_comment_story_id_created_at', ['story_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    if sa.inspect(op.get_bind()).has_table('story_comment'):
+        with op.batch_alter_table('story_comment', schema=None) as batch_op:
+            batch_op.drop_index('ix_story_comment_story_id_created_at')
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_post_id_created_at')
@@ -0,0 +1,109 @@
+"""Add hashtag, post_hashtag and story_hashtag tables
+
+Revision ID: d6b3e587618f
+Revises: 83a9a3d0b9d5
+Create Date: 2026-10-18 10:31:52.604117
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6b3e587618f'
+down_revision = '83a9a3d0b9d5'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _parse_hashtags(hashtags, description):
+    # Frozen copy of app.services.hashtag_service.parse_hashtags at the time of this migration
+    raw = re.split(r'[\s,#]+', hashtags or '')
+    raw += re.findall(r'#(\w+)', description or '')
+    tags = []
+    for tag in raw:
+        tag = re.sub(r'\W', '', tag).lower()[:100]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags[:30]
+
+
+def _backfill(table, link_table, fk_column):
+    bind = op.get_bind()
+    hashtag = sa.table('hashtag', sa.column('id'), sa.column('name'), sa.column('created_at'))
+    link = sa.table(link_table, sa.column('hashtag_id'), sa.column(fk_column), sa.column('created_at'))
+    tag_ids = dict(bind.execute(sa.select(hashtag.c.name, hashtag.c.id)).fetchall())
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(f'SELECT id, hashtags, description, created_at FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': BACKFILL_BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        links = []
+        for row in rows:
+            for name in _parse_hashtags(row.hashtags, row.description):
+                if name not in tag_ids:
+                    tag_ids[name] = bind.execute(
+                        hashtag.insert().values(name=name, created_at=sa.func.now()).returning(hashtag.c.id)
+                    ).scalar()
+                links.append({'hashtag_id': tag_ids[name], fk_column: row.id, 'created_at': row.created_at})
+        if links:
+            bind.execute(link.insert(), links)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    op.create_table('hashtag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('post_hashtag',
+    sa.Column('hashtag_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['hashtag_id'], ['hashtag.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hashtag_id', 'post_id')
+    )
+    op.create_table('story_hashtag',
+    sa.Column('hashtag_id', sa.Integer(), nullable=False),
+    sa.Column('story_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['hashtag_id'], ['hashtag.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['story_id'], ['story.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hashtag_id', 'story_id')
+    )
+    with op.batch_alter_table('post_hashtag', schema=None) as batch_op:
+        batch_op.create_index('ix_post_hashtag_tag_created', ['hashtag_id', 'created_at', 'post_id'], unique=False)
+        batch_op.create_index('ix_post_hashtag_post_id', ['post_id'], unique=False)
+
+    with op.batch_alter_table('story_hashtag', schema=None) as batch_op:
+        batch_op.create_index('ix_story_hashtag_tag_created', ['hashtag_id', 'created_at', 'story_id'], unique=False)
+        batch_op.create_index('ix_story_hashtag_story_id', ['story_id'], unique=False)
+
+    _backfill('post', 'post_hashtag', 'post_id')
+    _backfill('story', 'story_hashtag', 'story_id')
+
+
+def downgrade():
+    with op.batch_alter_table('story_hashtag', schema=None) as batch_op:
+        batch_op.drop_index('ix_story_hashtag_story_id')
+        batch_op.drop_index('ix_story_hashtag_tag_created')
+
+    with op.batch_alter_table('post_hashtag', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_hashtag_post_id')
+        batch_op.drop_index('ix_post_hashtag_tag_created')
+
+    op.drop_table('story_hashtag')
+    op.drop_table('post_hashtag')
+    op.drop_table('hashtag')
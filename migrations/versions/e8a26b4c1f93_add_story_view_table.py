@@ -0,0 +1,36 @@
+"""Add story_view table for story view receipts
+
+Revision ID: e8a26b4c1f93
+Revises: c39d0f6a8b12
+Create Date: 2026-10-18 16:25:48.602391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a26b4c1f93'
+down_revision = 'c39d0f6a8b12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('story_view',
+    sa.Column('viewer_id', sa.Integer(), nullable=False),
+    sa.Column('story_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['story_id'], ['story.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['viewer_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('viewer_id', 'story_id')
+    )
+    with op.batch_alter_table('story_view', schema=None) as batch_op:
+        batch_op.create_index('ix_story_view_story_created', ['story_id', 'created_at', 'viewer_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('story_view', schema=None) as batch_op:
+        batch_op.drop_index('ix_story_view_story_created')
+
+    op.drop_table('story_view')
@@ -0,0 +1,59 @@
+"""Add full-text search over post description and hashtags
+
+Revision ID: ec02fe7fb391
+Revises: d6b3e587618f
+Create Date: 2026-10-18 10:58:14.330972
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ec02fe7fb391'
+down_revision = 'd6b3e587618f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # A stored generated column is filled for existing rows by the ALTER itself
+        op.execute(
+            "ALTER TABLE post ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(hashtags, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+        )
+        op.execute("CREATE INDEX ix_post_search_vector ON post USING GIN (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+            "description, hashtags, content='post', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+            "INSERT INTO post_fts(rowid, description, hashtags) VALUES (new.id, new.description, new.hashtags); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+            "INSERT INTO post_fts(post_fts, rowid, description, hashtags) VALUES ('delete', old.id, old.description, old.hashtags); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF description, hashtags ON post BEGIN "
+            "INSERT INTO post_fts(post_fts, rowid, description, hashtags) VALUES ('delete', old.id, old.description, old.hashtags); "
+            "INSERT INTO post_fts(rowid, description, hashtags) VALUES (new.id, new.description, new.hashtags); END"
+        )
+        op.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_post_search_vector")
+        op.execute("ALTER TABLE post DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS post_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS post_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS post_fts_ai")
+        op.execute("DROP TABLE IF EXISTS post_fts")
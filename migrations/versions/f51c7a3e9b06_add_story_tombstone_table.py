@@ -0,0 +1,34 @@
+"""Add story_tombstone table for stories tray delta sync
+
+Revision ID: f51c7a3e9b06
+Revises: e8a26b4c1f93
+Create Date: 2026-10-18 17:10:05.247613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f51c7a3e9b06'
+down_revision = 'e8a26b4c1f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('story_tombstone',
+    sa.Column('story_id', sa.Integer(), nullable=False),
+    sa.Column('user_handle', sa.String(length=50), nullable=False),
+    sa.Column('removed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('story_id')
+    )
+    with op.batch_alter_table('story_tombstone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_story_tombstone_removed_at'), ['removed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('story_tombstone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_story_tombstone_removed_at'))
+
+    op.drop_table('story_tombstone')